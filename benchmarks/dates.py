@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Date recognition throughput in words/sec
+
+Builds a Layout from synthetic Tesseract output and times the recognizer
+alone (date_spans over each line's texts) and the full find_dates() pass,
+which also builds Date objects.  Run from the repository root:
+
+    python -m benchmarks.dates
+"""
+
+import random
+import time
+
+from src.date import date_spans, find_dates
+from src.layout import Layout, PAGE, BLOCK, PARAGRAPH, LINE, WORD
+# Importing the views registers them with Layout
+from src.page import Page  # noqa: F401
+from src.block import Block  # noqa: F401
+from src.paragraph import Paragraph  # noqa: F401
+from src.line import Line  # noqa: F401
+from src.word import Word  # noqa: F401
+
+VOCABULARY = ['Invoice', 'Total:', 'amount', 'the', 'of', 'Due', '$45.00',
+              'Account', '#12345', '(555)', 'Jan', 'March', '5,', '17',
+              '2024', '1999', '12/31/2023', '3-4-22', '01/00/2020',
+              '5-Mar', '14-Feb-2021', '13/45/2020', 'Paid.']
+
+
+def synthetic_data(n_words, words_per_line=10, lines_per_block=20):
+    random.seed(0)
+    columns = ('level', 'left', 'top', 'width', 'height', 'conf', 'text')
+    data = {column: [] for column in columns}
+
+    def node(level, text=''):
+        for column, value in zip(columns, (level, 0, 0, 10, 10, 95.0, text)):
+            data[column].append(value)
+
+    node(PAGE)
+    for i in range(n_words):
+        if i % (words_per_line * lines_per_block) == 0:
+            node(BLOCK)
+            node(PARAGRAPH)
+        if i % words_per_line == 0:
+            node(LINE)
+        node(WORD, random.choice(VOCABULARY))
+    return data
+
+
+def bench(n_words=200000):
+    layout = Layout(None, synthetic_data(n_words))
+    lines = layout.views(layout.at_level(LINE))
+    texts = [[word.text for word in line.words] for line in lines]
+
+    start = time.perf_counter()
+    spans = sum(1 for line in texts for span in date_spans(line))
+    recognize = time.perf_counter() - start
+
+    start = time.perf_counter()
+    dates = len(list(find_dates(lines)))
+    full = time.perf_counter() - start
+
+    print(f'{n_words} words, {spans} dates')
+    print(f'date_spans:  {n_words / recognize:12,.0f} words/sec')
+    print(f'find_dates:  {n_words / full:12,.0f} words/sec ({dates} Dates built)')
+
+
+if __name__ == '__main__':
+    bench()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Skew estimation: projection profile vs. the old rotate-and-getbbox search
+
+Renders a synthetic letter page at 300dpi, skews it by known angles and
+times both estimators.  Run from the repository root:
+
+    python -m benchmarks.skew
+"""
+
+import random
+import time
+
+from PIL import Image as PILImage, ImageDraw, ImageFilter
+
+from src.image import Image
+
+
+def legacy_skew_and_bbox(self, minimum=-45, maximum=45, step=1):
+    # Image.get_skew_and_bbox() as it was before the NumPy rewrite
+    guess = 0
+    dir = 1
+    orig_image = self.crop(20).thumbnail((400, 400)).filter(ImageFilter.GaussianBlur(1))
+    orig_image = orig_image.threshold(210)
+    orig_image = orig_image.invert()
+    orig_image = orig_image.filter(ImageFilter.MaxFilter(3))
+    orig_image = orig_image.filter(ImageFilter.MaxFilter(3))
+    if orig_image.getbbox():
+        left, upper, right, lower = orig_image.getbbox()
+    else:
+        return 0, (0, 0, orig_image.width, orig_image.height)
+    prev_area = (lower-upper)*(right-left)
+    equal_count = 0
+    while minimum <= guess <= maximum:
+        guess += step*dir
+        image = orig_image.rotate(guess)
+        bbox = image.getbbox()
+        if bbox:
+            area = (bbox[3]-bbox[1])*(bbox[2]-bbox[0])
+        else:
+            area = orig_image.width * orig_image.height
+        if area > prev_area:
+            if equal_count and bbox:
+                angle = guess - dir*step*equal_count/2
+                bbox = [i * max(self.size) / 400 for i in bbox]
+                return angle, bbox
+            dir *= -1
+            step *= 1/2
+        elif area == prev_area:
+            equal_count += 1
+        prev_area = area
+    return 0, orig_image.getbbox()
+
+
+def page(seed=0):
+    random.seed(seed)
+    image = PILImage.new('RGB', (2550, 3300), 'white')
+    draw = ImageDraw.Draw(image)
+    for top in range(300, 3000, 60):
+        left = 300
+        while left < 2200:
+            width = random.randint(40, 200)
+            draw.rectangle((left, top, left + width, top + 25), fill='black')
+            left += width + 30
+    return image
+
+
+def bench(estimator, image, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        angle, bbox = estimator(Image(image))
+    return angle, (time.perf_counter() - start) / runs
+
+
+if __name__ == '__main__':
+    runs = 3
+    original = page()
+    print(f'{"skew":>6} | {"legacy":>8} {"ms":>8} | {"numpy":>8} {"ms":>8}')
+    for skew in (-12, -5.5, -1.3, 0, 0.7, 2.5, 8):
+        skewed = original.rotate(-skew, fillcolor='white')
+        old, old_time = bench(legacy_skew_and_bbox, skewed, runs)
+        new, new_time = bench(Image.get_skew_and_bbox, skewed, runs)
+        print(f'{skew:6.1f} | {old:8.2f} {old_time * 1000:8.1f} | {new:8.2f} {new_time * 1000:8.1f}')
@@ -1,4 +1,10 @@
 import wx
+import queue
+import threading
+import pdf2image
+
+from collections import OrderedDict
+from PIL import Image as PILImage
 
 
 class Documents(wx.Panel):
@@ -11,31 +17,168 @@ class Documents(wx.Panel):
         super().__init__(parent)
         self.parent = parent
         self.library = parent.Parent.Parent.library
-        self.notebook = wx.Listbook(self, wx.ID_ANY, style=wx.BK_LEFT)
-        pages = [(wx.Panel(self, wx.ID_ANY), "Panel One"),
-                 (wx.Panel(self, wx.ID_ANY), "Panel Two"),
-                 (wx.Panel(self, wx.ID_ANY), "Panel Three")]
-        pages = [(wx.Panel(self, wx.ID_ANY), doc.id) for doc in self.library.documents]
-        for page, label in pages:
-            wx.LogDebug('Adding Document to UX')
-            self.notebook.AddPage(page, label)
+
+        splitter = wx.SplitterWindow(self, style=wx.SP_LIVE_UPDATE)
+        self.list = DocumentList(splitter, self.library)
+        self.preview = Preview(splitter)
+        splitter.SplitVertically(self.list, self.preview, 600)
+        splitter.SetMinimumPaneSize(200)
+
         sizer = wx.BoxSizer(wx.VERTICAL)
-        sizer.Add(self.notebook, 1, wx.EXPAND)
+        sizer.Add(splitter, 1, wx.EXPAND)
         self.SetSizer(sizer)
 
-        self.Bind(wx.EVT_LISTBOOK_PAGE_CHANGED, self.OnPageChanged)
-        self.Bind(wx.EVT_LISTBOOK_PAGE_CHANGING, self.OnPageChanging)
+        self.list.Bind(wx.EVT_LIST_ITEM_SELECTED, self.OnItemSelected)
 
-    def OnPageChanged(self, event):
-        old = event.GetOldSelection()
-        new = event.GetSelection()
-        sel = self.notebook.GetSelection()
-        wx.LogDebug('OnPageChanged,  old:%d, new:%d, sel:%d\n' % (old, new, sel))
+    def OnItemSelected(self, event):
+        doc = self.library.documents[event.GetIndex()]
+        wx.LogDebug(f'OnItemSelected: {doc.id}')
+        self.preview.Load(doc)
         event.Skip()
 
-    def OnPageChanging(self, event):
-        old = event.GetOldSelection()
-        new = event.GetSelection()
-        sel = self.notebook.GetSelection()
-        wx.LogDebug('OnPageChanging, old:%d, new:%d, sel:%d\n' % (old, new, sel))
-        event.Skip()
+    def Reload(self):
+        """
+        Pick up Documents added to the Library since the list was drawn
+        """
+        self.list.Reload()
+
+
+class DocumentList(wx.ListCtrl):
+    """
+    A virtual list of every Document in the Library
+
+    Rows are only drawn for what's on screen.  Thumbnails come out of the
+    Library's Atlas on a background thread into a fixed set of ImageList
+    slots, most recently shown first.
+    """
+
+    SLOTS = 256
+
+    def __init__(self, parent, library):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL)
+        self.library = library
+
+        width, height = library.atlas.SLOT_SIZE
+        self.image_list = wx.ImageList(width, height)
+        placeholder = wx.Image(width, height)
+        placeholder.Clear(0xff)  # White, like the thumbnails' backgrounds
+        placeholder = wx.Bitmap(placeholder)
+        for slot in range(self.SLOTS + 1):
+            self.image_list.Add(placeholder)
+        self.SetImageList(self.image_list, wx.IMAGE_LIST_SMALL)
+        # Slot 0 stays the placeholder.  The rest go to the most recently
+        # shown thumbnails: {id: slot}
+        self._slots = OrderedDict()
+        self._requested = set()
+        self._queue = queue.LifoQueue()
+        threading.Thread(target=self._load_thumbnails, name='DocumentList', daemon=True).start()
+
+        self.InsertColumn(0, '', width=width + 16)
+        self.InsertColumn(1, 'Date', width=120)
+        self.InsertColumn(2, 'Imported', width=180)
+        self.InsertColumn(3, 'ID', width=280)
+
+        self.SetItemCount(len(self.library.documents))
+
+    def Reload(self):
+        self.SetItemCount(len(self.library.documents))
+        self.Refresh()
+
+    ###########################################################################
+    # Virtual List Callbacks
+    ###########################################################################
+
+    def OnGetItemText(self, item, column):
+        doc = self.library.documents[item]
+        if column == 1:
+            return doc.date
+        elif column == 2:
+            return doc.imported
+        elif column == 3:
+            return doc.id
+        return ''
+
+    def OnGetItemImage(self, item):
+        doc = self.library.documents[item]
+        if doc.id in self._slots:
+            self._slots.move_to_end(doc.id)
+            return self._slots[doc.id]
+        if doc.id not in self._requested:
+            self._requested.add(doc.id)
+            self._queue.put((item, doc))
+        return 0
+
+    ###########################################################################
+    # Thumbnail Loading
+    ###########################################################################
+
+    def _load_thumbnails(self):
+        width, height = self.library.atlas.SLOT_SIZE
+        while True:
+            item, doc = self._queue.get()
+            try:
+                thumbnail = self.library.thumbnail(doc)
+            except Exception as e:
+                wx.LogDebug(f'DocumentList: {doc.thumb_path}: {e!r}')
+                thumbnail = None
+            if thumbnail:
+                # Centre it on a slot-sized canvas; ImageList wants them all
+                # the same size
+                w, h, pixels = thumbnail
+                canvas = PILImage.new('RGB', (width, height), 'white')
+                canvas.paste(PILImage.frombytes('RGB', (w, h), bytes(pixels)),
+                             ((width - w) // 2, (height - h) // 2))
+                wx.CallAfter(self._on_thumbnail, item, doc.id, canvas.tobytes())
+            else:
+                wx.CallAfter(self._requested.discard, doc.id)
+
+    def _on_thumbnail(self, item, id, pixels):
+        self._requested.discard(id)
+        width, height = self.library.atlas.SLOT_SIZE
+        if len(self._slots) < self.SLOTS:
+            slot = len(self._slots) + 1
+        else:
+            evicted, slot = self._slots.popitem(last=False)
+        self.image_list.Replace(slot, wx.Bitmap.FromBuffer(width, height, pixels))
+        self._slots[id] = slot
+        if item < self.GetItemCount():
+            self.RefreshItem(item)
+
+
+class Preview(wx.ScrolledWindow):
+    """
+    The selected Document's first page, rendered on a background thread
+    """
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.SetScrollRate(10, 10)
+        self.bitmap = wx.StaticBitmap(self)
+        self._generation = 0
+
+    def Load(self, doc):
+        self._generation += 1
+        width = max(self.GetClientSize().width, 200)
+        threading.Thread(target=self._render,
+                         args=(doc, width, self._generation),
+                         daemon=True).start()
+
+    def _render(self, doc, width, generation):
+        if generation != self._generation:
+            return
+        try:
+            page = pdf2image.convert_from_path(doc.processed_path,
+                                               first_page=1,
+                                               last_page=1,
+                                               size=(width, None))[0].convert('RGB')
+        except Exception as e:
+            wx.LogDebug(f'Preview: {doc.processed_path}: {e!r}')
+            return
+        wx.CallAfter(self._on_render, page.width, page.height, page.tobytes(), generation)
+
+    def _on_render(self, width, height, pixels, generation):
+        # Only the most recent selection gets shown
+        if generation != self._generation:
+            return
+        self.bitmap.SetBitmap(wx.Bitmap.FromBuffer(width, height, pixels))
+        self.SetVirtualSize(width, height)
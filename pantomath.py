@@ -3,9 +3,7 @@
 import wx
 import os
 
-from datetime import datetime
-
-from src import Scanner, Config, Library, VehiclePage
+from src import Scanner, Config, Library, Importer, Inbox, VehiclePage
 from pages import Documents, Organizations
 
 
@@ -14,20 +12,24 @@ class MainFrame(wx.Frame):
         super().__init__(*args, **kw)
 
         self.config = Config("pantomath")
-        self.library = Library(self.GetLibraryDir())
+        self.library = Library(self.GetLibraryDir(),
+                               self.config.ReadInt("/Import/Workers", os.cpu_count()),
+                               self.config.ReadInt("/Library/Cache", 64))
 
-        self.CreateStatusBar(2)
+        self.CreateStatusBar(3)
         self.SetStatusText("Pantomath v0.1")
         self.SetStatusText("Not connected to scanner", 1)
 
+        self.importer = Importer(self, self.config.ReadInt("/Import/Jobs", 2))
+
         self.scanner = Scanner(self)
 
         panel = wx.Panel(self)
         notebook = wx.Notebook(panel)
-        docsPage = Documents(notebook)
+        self.docsPage = Documents(notebook)
         orgsPage = Organizations(notebook)
 
-        notebook.AddPage(docsPage, 'Documents')
+        notebook.AddPage(self.docsPage, 'Documents')
         notebook.AddPage(orgsPage, 'Organizations')
         notebook.AddPage(VehiclePage(notebook), 'Vehicles')
 
@@ -38,47 +40,18 @@ class MainFrame(wx.Frame):
         self.CreateMenuBar()
 
     def CreateFileSystemWatcher(self):
-        self._fswatcher = wx.FileSystemWatcher()
-        self._fswatcher.Bind(wx.EVT_FSWATCHER, self.OnFSEvent)
-        self.inbox = os.path.join(self.library.dir, 'Inbox/')
-        os.makedirs(self.inbox, exist_ok=True)
-        self._fswatcher.Add(self.inbox)
-
-    def OnFSEvent(self, event):
-        flags = {
-            wx.FSW_EVENT_CREATE: 'wx.FSW_EVENT_CREATE',
-            wx.FSW_EVENT_DELETE: 'wx.FSW_EVENT_DELETE',
-            wx.FSW_EVENT_RENAME: 'wx.FSW_EVENT_RENAME',
-            wx.FSW_EVENT_MODIFY: 'wx.FSW_EVENT_MODIFY',
-            wx.FSW_EVENT_ACCESS: 'wx.FSW_EVENT_ACCESS',
-            wx.FSW_EVENT_ATTRIB: 'wx.FSW_EVENT_ATTRIB',
-            wx.FSW_EVENT_UNMOUNT: 'wx.FSW_EVENT_UNMOUNT',
-            wx.FSW_EVENT_WARNING: 'wx.FSW_EVENT_WARNING',
-            wx.FSW_EVENT_ERROR: 'wx.FSW_EVENT_ERROR',
-            wx.FSW_EVENT_ALL: 'wx.FSW_EVENT_ALL',
-        }
-        wx.LogDebug(f'ChangeType: {flags[event.ChangeType]}')
-        wx.LogDebug(event.Path)
-        self._last_fs_event = datetime.now()
-        if event.ChangeType == wx.FSW_EVENT_CREATE or event.ChangeType == wx.FSW_EVENT_RENAME:
-            self.ImportFromInbox(event.Path)
-
-    def InboxHasSettled(self):
-        return (datetime.now()-self._last_fs_event).total_seconds() > 2
-
-    def ImportFromInbox(self, filepath):
-        if self.InboxHasSettled():
-            if os.path.exists(filepath):
-                wx.LogDebug(f'Importing {filepath}')
-                if self.library.import_file(filepath):
-                    if self.config.Read("/Import/RemoveSource", ''):
-                        wx.LogDebug(f'Removing {filepath}')
-                        os.remove(filepath)
-            else:
-                wx.LogDebug(f'{filepath} no longer exists.  It was probably a browser temp file')
-        else:
-            wx.LogDebug('Waiting for Inbox to settle')
-            wx.CallLater(1000, self.ImportFromInbox, filepath)
+        self.inbox = Inbox(self,
+                           os.path.join(self.library.dir, 'Inbox/'),
+                           self.config.ReadInt("/Import/InboxJobs", 8))
+
+    def OnImported(self, doc):
+        self.docsPage.Reload()
+        vehicles = doc.entities_of('vehicle')
+        if vehicles:
+            wx.MessageBox('\n'.join(f"{entity['vehicle']}: {entity['text']} looks a lot like {entity['match']}"
+                                    for entity in vehicles),
+                          'Vehicles Detected!',
+                          wx.OK | wx.ICON_INFORMATION)
 
     def GetLibraryDir(self):
         dir = self.config.Read("/Library/Path", '')
@@ -113,6 +86,8 @@ class MainFrame(wx.Frame):
         self.Bind(wx.EVT_MENU, self.Exit, exitItem)
         importItem = fileMenu.Append(wx.ID_ANY, "&Import File\tALT-I")
         self.Bind(wx.EVT_MENU, self.OnImportFile, importItem)
+        searchItem = fileMenu.Append(wx.ID_FIND, "&Search Library\tCTRL-F")
+        self.Bind(wx.EVT_MENU, self.OnSearch, searchItem)
 
         settingsMenu = wx.Menu()
         libraryLocation = settingsMenu.Append(wx.ID_ANY, "Update &Library Location\tALT-L")
@@ -121,6 +96,10 @@ class MainFrame(wx.Frame):
         self.Bind(wx.EVT_MENU, self.OnRIO, self.rio)
         riostate = self.config.ReadBool("/Import/RemoveSource", False)
         self.rio.Check(riostate)
+        rebuildSearch = settingsMenu.Append(wx.ID_ANY, "Re&build Search Index")
+        self.Bind(wx.EVT_MENU, self.OnRebuildSearch, rebuildSearch)
+        rebuildAtlas = settingsMenu.Append(wx.ID_ANY, "Rebuild &Thumbnails")
+        self.Bind(wx.EVT_MENU, self.OnRebuildAtlas, rebuildAtlas)
         fileMenu.AppendSubMenu(settingsMenu, '&Settings')
 
         #######################################################################
@@ -177,7 +156,10 @@ class MainFrame(wx.Frame):
     def OnImportFile(self, event):
         filepath = self.ChooseFile()
         if filepath:
-            self.library.import_file(filepath)
+            self.importer.submit(Importer.INTERACTIVE,
+                                 os.path.basename(filepath),
+                                 self.library.import_file,
+                                 filepath)
 
     # def ImportImage(self, image):
     #     self.PushStatusText("Processing image...", 1)
@@ -242,6 +224,34 @@ class MainFrame(wx.Frame):
             wx.LogDebug(f'Removing {filepath}')
             os.remove(filepath)
 
+    def OnSearch(self, event):
+        with wx.TextEntryDialog(self,
+                                "Words to look for.  End a word with * to match it as a prefix, or ~ to allow misspellings.",
+                                "Search Library") as dialog:
+            if dialog.ShowModal() == wx.ID_CANCEL:
+                return
+            query = dialog.GetValue()
+        results = self.library.search(query)
+        if not results:
+            wx.MessageBox(f'Nothing matches "{query}"', "Search Library")
+            return
+        choices = [f'{doc.date}  {len(hits)} hits on page {", ".join(str(page) for page in sorted({page for page, word in hits}))}  ({doc.id})'
+                   for doc, hits in results]
+        with wx.SingleChoiceDialog(self, query, "Search Results", choices) as dialog:
+            if dialog.ShowModal() == wx.ID_OK:
+                doc = results[dialog.GetSelection()][0]
+                wx.LaunchDefaultApplication(doc.processed_path)
+
+    def OnRebuildSearch(self, event):
+        self.importer.submit(Importer.INBOX,
+                             'search index',
+                             self.library.rebuild_search)
+
+    def OnRebuildAtlas(self, event):
+        self.importer.submit(Importer.INBOX,
+                             'thumbnails',
+                             self.library.rebuild_atlas)
+
     def ChooseFile(self):
         with wx.FileDialog(self,
                            "Import file",
@@ -252,6 +262,9 @@ class MainFrame(wx.Frame):
             return fileDialog.GetPath()
 
     def Exit(self, event):
+        self.scanner.session.close()
+        self.library.engine.shutdown()
+        self.library.atlas.close()
         self.Close(True)
 
     def About(self, event):
@@ -1,5 +1,7 @@
 from .confmenu import ConfMenu
 from .library import Library
+from .importer import Importer
+from .inbox import Inbox
 from .scanner import Scanner
 from .config import Config
 from .image import Image
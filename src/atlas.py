@@ -0,0 +1,163 @@
+import wx
+import os
+import mmap
+import heapq
+import threading
+
+from PIL import Image as PILImage
+
+
+class Atlas():
+    """
+    Every Document's thumbnail packed into one memory-mapped file
+
+    The file is an array of fixed-size slots, each holding one thumbnail as
+    raw RGB rows at its own width and height.  Which slot belongs to which
+    Document lives in the Index.  A grid can read hundreds of thumbnails
+    straight out of the mapping without opening a file for each.
+    """
+
+    FILENAME = 'thumbnails.atlas'
+    SLOT_SIZE = (128, 128)
+    GROW = 256  # slots added each time the file fills up
+
+    def __init__(self, dir, index):
+        self.path = os.path.join(dir, self.FILENAME)
+        self.index = index
+        self.slot_bytes = self.SLOT_SIZE[0] * self.SLOT_SIZE[1] * 3
+        self._lock = threading.RLock()
+        self._slots = {row['doc']: (row['slot'], row['width'], row['height'])
+                       for row in index.thumbnails()}
+        used = {slot for slot, width, height in self._slots.values()}
+        self._next = max(used, default=-1) + 1
+        self._free = [slot for slot in range(self._next) if slot not in used]
+        heapq.heapify(self._free)
+
+        if not os.path.exists(self.path) or not self._slots:
+            # No slots means a new or recreated Index; whatever's in the
+            # file is stale
+            with open(self.path, 'wb'):
+                pass
+        self._file = open(self.path, 'r+b')
+        self._map = None
+        self._remap()
+
+    def __contains__(self, id):
+        return id in self._slots
+
+    def __len__(self):
+        return len(self._slots)
+
+    ###########################################################################
+    # Mapping
+    ###########################################################################
+
+    @property
+    def capacity(self):
+        return os.fstat(self._file.fileno()).st_size // self.slot_bytes
+
+    def _remap(self):
+        # Views handed out by view() keep the old mapping alive until
+        # they're let go, so it's never closed here
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), size) if size else None
+
+    def _grow(self, slots):
+        wx.LogDebug(f'Atlas: Growing to {slots} slots')
+        self._file.truncate(slots * self.slot_bytes)
+        self._remap()
+
+    ###########################################################################
+    # Slots
+    ###########################################################################
+
+    def add(self, id, pil_image):
+        """
+        Store pil_image, shrunk to fit a slot, as id's thumbnail
+        """
+        image = pil_image.convert('RGB')
+        if image.width > self.SLOT_SIZE[0] or image.height > self.SLOT_SIZE[1]:
+            image.thumbnail(self.SLOT_SIZE)
+        pixels = image.tobytes()
+        with self._lock:
+            if id in self._slots:
+                slot = self._slots[id][0]
+            elif self._free:
+                slot = heapq.heappop(self._free)
+            else:
+                slot = self._next
+                self._next += 1
+            if slot >= self.capacity:
+                self._grow(slot + self.GROW)
+            offset = slot * self.slot_bytes
+            self._map[offset:offset + len(pixels)] = pixels
+            self._slots[id] = (slot, image.width, image.height)
+        # Never call into the Index holding our lock.  Importers take the
+        # Index's lock first and ours second.
+        self.index.set_thumbnail(id, slot, image.width, image.height)
+
+    def remove(self, id):
+        with self._lock:
+            if id not in self._slots:
+                return
+            heapq.heappush(self._free, self._slots.pop(id)[0])
+        self.index.remove_thumbnail(id)
+
+    def view(self, id):
+        """
+        Returns (width, height, RGB bytes) without copying, or None
+
+        The bytes are a memoryview into the mapping, ready for
+        wx.Bitmap.FromBuffer.
+        """
+        with self._lock:
+            if id not in self._slots:
+                return None
+            slot, width, height = self._slots[id]
+            offset = slot * self.slot_bytes
+            return width, height, memoryview(self._map)[offset:offset + width * height * 3]
+
+    def image(self, id):
+        """
+        id's thumbnail as a PIL Image, or None
+        """
+        if found := self.view(id):
+            width, height, pixels = found
+            return PILImage.frombytes('RGB', (width, height), bytes(pixels))
+
+    ###########################################################################
+    # Rebuilding
+    ###########################################################################
+
+    def add_file(self, id, thumb_path):
+        """
+        Fill id's slot from a per-Document thumbnail.  False if there isn't one.
+        """
+        if not os.path.exists(thumb_path):
+            return False
+        with PILImage.open(thumb_path) as pil_image:
+            self.add(id, pil_image)
+        return True
+
+    def rebuild(self, documents, progress=None):
+        """
+        Repack the Atlas from each Document's thumbnail.webp
+        """
+        progress = progress or (lambda text: None)
+        # Slots are overwritten in place.  The file is never shrunk under
+        # a mapping someone might still be reading.
+        self.index.clear_thumbnails()
+        with self._lock:
+            self._slots = {}
+            self._free = []
+            self._next = 0
+            if self.capacity < len(documents):
+                self._grow(len(documents))
+        for n, doc in enumerate(documents, start=1):
+            progress(f'{n} of {len(documents)}')
+            self.add_file(doc.id, doc.thumb_path)
+
+    def close(self):
+        with self._lock:
+            self._map = None
+            self._file.close()
@@ -1,22 +1,26 @@
-from .placeable import Placeable
+from .layout import Node, BLOCK, LINE, WORD
 
 
-class Block(Placeable):
-    def __init__(self, page, left, top, width, height, confidence, text):
-        super().__init__(left, top, width, height)
-        if text:
-            raise Exception(f'Block should never be passed text directly: {text}')
-        self.page = page
-        self.paragraphs = []
+class Block(Node):
+    __slots__ = ()
+    LEVEL = BLOCK
 
     ###########################################################################
     # Properties
     ###########################################################################
 
+    @property
+    def page(self):
+        return self.parent
+
+    @property
+    def paragraphs(self):
+        return self.children
+
     @property
     def lines(self):
-        return [line for paragraph in self.paragraphs for line in paragraph.lines]
+        return self.descendants(LINE)
 
     @property
     def words(self):
-        return [word for line in self.lines for word in line.words]
+        return self.descendants(WORD)
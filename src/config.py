@@ -34,3 +34,13 @@ class Config(wx.Config):
         result = super().WriteBool(*args)
         super().Flush()
         return result
+
+    def ReadInt(self, *args):
+        wx.LogDebug(f"Config.ReadInt({args})")
+        return super().ReadInt(*args)
+
+    def WriteInt(self, *args):
+        wx.LogDebug(f"Config.WriteInt({args})")
+        result = super().WriteInt(*args)
+        super().Flush()
+        return result
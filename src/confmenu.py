@@ -25,3 +25,8 @@ class ConfMenu(wx.Menu):
         for item in args:
             if self.frame.config.Read(f"{self.prefix}/{kwargs['confKey']}") == item['confValue']:
                 self.Check(item['obj'].GetId(), True)
+
+    def Clear(self):
+        for item in self.GetMenuItems():
+            self.frame.Unbind(wx.EVT_MENU, item)
+            self.Delete(item)
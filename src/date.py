@@ -1,9 +1,97 @@
+import re
 import datetime
 
 from dateutil.parser import parse
 
 from .bagofwords import BagOfWords
 
+###############################################################################
+# Recognizer
+###############################################################################
+
+MONTHS = r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*'
+
+MONTH = re.compile(MONTHS, re.IGNORECASE)
+NUMERIC_DATE = re.compile(r'^(\d{1,2})[/-](\d{1,2})[/-](\d{2}|\d{4})$')  # m[m]/d[d]/yy[yy]
+DAY_MONTH_YEAR = re.compile(r'(\d{1,2})-([a-zA-Z]+)-(\d{2,4})')           # d[d]-month-yy[yy]
+DAY_MONTH = re.compile(rf'(\d{{1,2}})-{MONTHS}', re.IGNORECASE)            # d[d]-month
+YEAR = re.compile(r'\d{2,4}$')
+DAY = re.compile(r'\d{1,2}')
+
+
+def is_date_token(text):
+    """
+    Whether a single token is a whole date on its own
+    """
+    # The DMV is a fan of 00/00/YYYY when they don't know the details
+    if '/00/' in text:
+        return False
+    if match := NUMERIC_DATE.match(text):
+        # Looks like a date either way, but bad OCR can put it out of range
+        return 0 < int(match.group(1)) < 13 and 0 < int(match.group(2)) < 32
+    if match := DAY_MONTH_YEAR.search(text):
+        return 0 < int(match.group(1)) < 32 and bool(MONTH.search(match.group(2)))
+    return False
+
+
+def year_span(text, prev=None, prev_prev=None):
+    """
+    How many tokens, ending with a year-ish text, make up a date
+
+    3 for month day year, 2 for day-month year, 0 if it's not a date
+    """
+    if prev is None or not YEAR.match(text):
+        return 0
+    match = DAY.match(prev)
+    if match and 0 < int(match.group()) < 32 and prev_prev is not None and MONTH.search(prev_prev):
+        return 3
+    if DAY_MONTH.search(prev):
+        return 2
+    return 0
+
+
+def date_spans(texts):
+    """
+    Yields (start, end) for every date in one line's token texts
+    """
+    for i, text in enumerate(texts):
+        if is_date_token(text):
+            yield i, i + 1
+        elif span := year_span(text,
+                               texts[i - 1] if i > 0 else None,
+                               texts[i - 2] if i > 1 else None):
+            yield i + 1 - span, i + 1
+
+
+TYPES = {
+    1: ('date',),
+    2: ('day-month', 'year'),
+    3: ('month', 'day', 'year'),
+}
+
+
+def line_dates(words):
+    """
+    Yields a Date for every date among one line's words
+    """
+    for start, end in date_spans([word.text for word in words]):
+        span = words[start:end]
+        for word, type in zip(span, TYPES[end - start]):
+            word.type = type
+        try:
+            yield Date(span)
+        except (ValueError, OverflowError):
+            # Passed the recognizer, but dateutil can't make sense of it
+            pass
+
+
+def find_dates(lines):
+    """
+    Yields a Date for every date in lines, scanning each line's words once
+    """
+    for line in lines:
+        yield from line_dates(line.words)
+
 
 class Date(BagOfWords):
 
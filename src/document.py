@@ -1,19 +1,19 @@
 import wx
 import os
-import PIL
 import json
-import pytesseract
-
-from pytesseract import Output
 
+from .layout import Layout, BLOCK, PARAGRAPH, LINE, WORD
+# Importing the views registers them with Layout
 from .page import Page
 from .block import Block
 from .paragraph import Paragraph
 from .line import Line
 from .word import Word
 from .date import Date
+from .extractors import extract
 from .image import Image
 from .original import Original
+from .engine import collect, merge_data, merge_pdfs
 
 RED = "\033[91m"
 GREEN = "\033[92m"
@@ -24,36 +24,60 @@ END = "\033[0m"
 
 class Document():
 
-    def __init__(self, library, pages=None):
+    def __init__(self, library, pages=None, md5=None, progress=None, results=None):
         self.library = library
-        self.id = library.new_id()
+        self.id = None
+        self.md5 = md5
+        self.progress = progress or (lambda text: None)
 
-        self._processed = None
+        self._data = None
+        self._pdf = None
+        self._results = results
         self._json_path = None
+        self._folder_path = None
         self._thumbnail = None
-        self._json = {'imported': Date.today()}
+        self._json = {}
         self._date = None
-        self._dates = []
+        self._dates = None  # Until extract() has run
+        self._layout = None
         self._pages = []
+        self._flat = {}
 
-        self.original = Original(pages)
+        self.original = None
+        if pages is not None:
+            self.id = library.new_id()
+            self._json = {'imported': Date.today()}
+            self.original = Original(pages)
 
     ###########################################################################
     # Factory Methods
     ###########################################################################
 
     @classmethod
-    def from_json(cls, json_path):
+    def from_json(cls, library, json_path):
         """
         JSON constructor
 
         Takes in an absolute path to a JSON file
         Returns a ready-to-use Document object
         """
-        doc = cls()
+        doc = cls(library)
         doc.load_json(json_path)
         return doc
 
+    @classmethod
+    def from_handle(cls, library, handle):
+        """
+        Handle constructor
+
+        Takes in one of the Library's DocumentHandles
+        Returns a Document whose JSON is only read when first needed
+        """
+        doc = cls(library)
+        doc.json_path = handle.json_path
+        doc.md5 = handle.md5
+        return doc
+
     ###########################################################################
     # Object Manipulation
     ###########################################################################
@@ -87,62 +111,157 @@ class Document():
     def load_json(self, json_path):
         self.json_path = json_path
         with open(self.json_path, 'r') as json_file:
-            self.json = json.load(json_file)
+            self._json = json.load(json_file)
+        self.md5 = self._json.get('md5')
 
     def write_json(self):
-        with open(self.json_path, 'w') as file:
-            json.dump(self.json, file, indent=3, sort_keys=True, default=str)
+        if self.md5:
+            self.json['md5'] = self.md5
+        with self.library.index.transaction():
+            with open(self.json_path, 'w') as file:
+                json.dump(self.json, file, indent=3, sort_keys=True, default=str)
+            self.library.index.update(self)
+        self.library.refresh(self)
+
+    def write_ocr(self):
+        wx.LogDebug(f'Document.write_ocr({self.ocr_path})')
+        self.layout.save(self.ocr_path)
+
+    def migrate_ocr(self):
+        """
+        Move OCR data out of props.json and into its sidecar
+        """
+        wx.LogDebug(f'Document.migrate_ocr({self.id})')
+        self.write_ocr()
+        del self.json['data']
+        self.write_json()
 
     def write_processed(self):
         wx.LogDebug('Document.write_processed(): Getting Sandwich PDF')
-        wx.LogDebug(f'self.processed has {self.processed.n_frames} pages')
-        self.processed.save(f'{self.id}.tiff',
-                            compression='lzma',
-                            lossless=True,
-                            save_all=True)
-        data = pytesseract.image_to_pdf_or_hocr(f'{self.id}.tiff', extension='pdf')
-        os.remove(f'{self.id}.tiff')
         wx.LogDebug('Document.write_processed(): Writing Bytes')
         with open(self.processed_path, 'w+b') as file:
-            file.write(data)
+            file.write(self.processed)
         wx.LogDebug('Document.write_processed(END)')
 
     def write_thumb(self):
         wx.LogDebug('write_thumb()')
         self.thumb.save(self.thumb_path)
+        self.library.atlas.add(self.id, self.thumb.pil_image)
 
     def write_files(self, lib_dir):
         self.lib_dir = lib_dir
+        if 'entities' not in self.json:
+            self.extract()
         os.makedirs(self.folder_path)
-        self.write_json()
+        self.json['original'] = os.path.basename(self.original_path)
+        # Only add the Index rows once every file has made it to disk.  The
+        # slow writes stay outside the transaction so searches aren't held
+        # up behind them.
+        self.progress('Writing files')
+        self.write_ocr()
         self.write_original()
         self.write_processed()
         self.write_thumb()
+        with self.library.index.transaction():
+            self.write_json()
+            self.library.index.update_postings(self)
+
+    @property
+    def files(self):
+        """
+        Every file the Document keeps in its folder
+        """
+        files = [self.json_path, self.ocr_path, self.processed_path, self.thumb_path]
+        if original := self.json.get('original'):
+            files.append(os.path.join(self.folder_path, original))
+        return files
 
     def delete_files(self):
-        for file in self.files:
-            os.remove(file)
+        """
+        Remove the Document from disk, the Index and the Atlas
+        """
+        wx.LogDebug(f'Document.delete_files({self.id})')
+        files = self.files
+        for file in files:
+            if os.path.exists(file):
+                os.remove(file)
+        try:
+            os.rmdir(self.folder_path)
+        except OSError as e:
+            wx.LogDebug(f'Leaving {self.folder_path}: {e!r}')
+        self.library.atlas.remove(self.id)
+        self.library.index.remove(self.id)
+        self.library.evict(self.id)
+
+    ###########################################################################
+    # OCR
+    ###########################################################################
+
+    def ocr(self):
+        """
+        Deskew, autocrop and OCR every page on the Library's Engine
+
+        If the pages were already handed to the Engine as they came in, the
+        results Futures are collected instead.
+
+        Returns the layout data (as image_to_data would) and the Sandwich PDF
+        """
+        if self._data is None:
+            wx.LogDebug('Document.ocr(): Processing pages')
+            if self._results:
+                results = collect(self._results)
+            else:
+                results = self.library.engine.process(self.original.pages)
+            datas, pdfs = [], []
+            for data, pdf, thumb in results:
+                datas.append(data)
+                pdfs.append(pdf)
+                if thumb:
+                    self._thumbnail = Image(thumb)
+                self.progress(f'Processed page {len(pdfs)}')
+            self.progress('Assembling PDF')
+            self._data = merge_data(datas)
+            self._pdf = merge_pdfs(pdfs)
+            self._results = None
+            wx.LogDebug('Document.ocr(END)')
+        return self._data, self._pdf
 
     ###########################################################################
     # Collections
     ###########################################################################
 
+    def flatten(self, level):
+        """
+        Every node at level, in document order
+
+        Built once per Layout and cached until invalidate()
+        """
+        if level not in self._flat:
+            layout = self.layout
+            self._flat[level] = layout.views(layout.at_level(level))
+        return self._flat[level]
+
+    def invalidate(self):
+        self._layout = None
+        self._pages = []
+        self._flat = {}
+        self._dates = None
+
     @property
     def blocks(self):
-        wx.LogDebug(f'{RED}Document has {len(self.pages)} pages{END}')
-        return [block for page in self.pages for block in page.blocks]
+        return self.flatten(BLOCK)
 
     @property
     def paragraphs(self):
-        return [paragraph for block in self.blocks for paragraph in block.paragraphs]
+        return self.flatten(PARAGRAPH)
 
     @property
     def lines(self):
-        return [line for paragraph in self.paragraphs for line in paragraph.lines]
+        return self.flatten(LINE)
 
     @property
     def words(self):
-        return [word for line in self.lines for word in line.words]
+        return self.flatten(WORD)
 
     ###########################################################################
     # Properties
@@ -152,126 +271,70 @@ class Document():
     def thumb(self):
         wx.LogDebug('thumb()')
         if not self._thumbnail:
-            self._thumbnail = Image(self.processed).thumbnail()
+            self.ocr()
         return self._thumbnail
 
     @property
     def processed(self):
-        wx.LogDebug('Document.processed()')
-        wx.LogDebug(f'Document.processed(): _processed before: {self._processed}')
-        if not self._processed:
-            pages = [page.deskew().autocrop() for page in self.original.pages]
-            pages[0].save(f'{self.id}.tiff',
-                          compression='lzma',
-                          save_all=True,
-                          append_images=pages[1:])
-            self._processed = PIL.Image.open(f'{self.id}.tiff')
-            wx.LogDebug(f'{GREEN}Saving{END} {BOLD}{self.id}.tiff{END}')
-#            os.remove(f'{self.id}.tiff')
-        wx.LogDebug(f'Document.processed(): _processed after: {self._processed}')
-        wx.LogDebug('Document.processed(END)')
-        return self._processed
+        """
+        The Sandwich PDF
+        """
+        return self.ocr()[1]
+
+    @property
+    def layout(self):
+        if self._layout is None:
+            wx.LogDebug('layout(): Loading Tesseract Data')
+            if self._folder_path and os.path.exists(self.ocr_path):
+                self._layout = Layout.load(self, self.ocr_path)
+            elif 'data' in self.json:
+                # Libraries from before the sidecar kept it all in props.json
+                self._layout = Layout(self, self.json['data'])
+                self.migrate_ocr()
+            else:
+                self._layout = Layout(self, self.ocr()[0])
+            self._flat = {}
+        return self._layout
+
+    @property
+    def has_ocr(self):
+        return os.path.exists(self.ocr_path) or 'data' in self.json
 
     @property
     def pages(self):
-        wx.LogDebug(f'pages(START): {self._pages}')
         if not self._pages:
-
-            PAGE = 1
-            BLOCK = 2
-            PARAGRAPH = 3
-            LINE = 4
-            WORD = 5
-
-            wx.LogDebug('pages(): Loading Tesseract Data')
-            self.processed # Need to run this to generate the file below.  Need to fix this.
-            data = pytesseract.image_to_data(f'{self.id}.tiff',
-                                             output_type=Output.DICT)
-            os.remove(f'{self.id}.tiff')
-            wx.LogDebug('pages(): Done with image_to_data()')
-            self._json['data'] = data
-
-            page = None
-            block = None
-            paragraph = None
-            line = None
-            i = 0
-            wx.LogDebug('pages(): Parsing Levels')
-            for level in data['level']:
-                # wx.LogDebug(f'{GREEN}Level:{END} {BOLD}{level}{END}')
-                if level == PAGE:
-                    page = Page(self,
-                                data['left'][i],
-                                data['top'][i],
-                                data['width'][i],
-                                data['height'][i],
-                                data['conf'][i],
-                                data['text'][i])
-                    self._pages.append(page)
-                elif level == BLOCK:
-                    block = Block(page,
-                                  data['left'][i],
-                                  data['top'][i],
-                                  data['width'][i],
-                                  data['height'][i],
-                                  data['conf'][i],
-                                  data['text'][i])
-                    page.blocks.append(block)
-                elif level == PARAGRAPH:
-                    paragraph = Paragraph(block,
-                                          data['left'][i],
-                                          data['top'][i],
-                                          data['width'][i],
-                                          data['height'][i],
-                                          data['conf'][i],
-                                          data['text'][i])
-                    block.paragraphs.append(paragraph)
-                elif level == LINE:
-                    line = Line(paragraph,
-                                data['left'][i],
-                                data['top'][i],
-                                data['width'][i],
-                                data['height'][i],
-                                data['conf'][i],
-                                data['text'][i])
-                    paragraph.lines.append(line)
-                elif level == WORD:
-                    if data['text'][i] and not data['text'][i].isspace():
-                        word = Word(line,
-                                    data['left'][i],
-                                    data['top'][i],
-                                    data['width'][i],
-                                    data['height'][i],
-                                    data['conf'][i],
-                                    data['text'][i])
-                        line.append(word)
-                else:
-                    raise Exception(f'Unknown level.  Did Tesseract change their TSV spec?: {level}')
-                i += 1
-        wx.LogDebug('pages(END)')
+            self._pages = self.layout.pages
         return self._pages
 
-#TODO: Refactor this mess as it's no longer just dates
+    ###########################################################################
+    # Entities
+    ###########################################################################
+
+    def extract(self):
+        """
+        Run every Extractor over the Document and store what they found
+        """
+        self.progress('Extracting entities')
+        extractors = extract(self)
+        self._dates = extractors['date'].dates
+        self.json['entities'] = [entity
+                                 for extractor in extractors.values()
+                                 for entity in extractor.entities]
+        return self.json['entities']
+
+    @property
+    def entities(self):
+        if 'entities' not in self.json:
+            self.extract()
+        return self.json['entities']
+
+    def entities_of(self, kind):
+        return [entity for entity in self.entities if entity['kind'] == kind]
+
     @property
     def dates(self):
-        if not self._dates:
-            wx.LogDebug("Looking for dates")
-            for word in self.words:
-                if word.is_date:
-                    self._dates.append(Date([word]))
-                if word.is_year:
-                    if word.prev.type == 'day' and word.prev.prev.type == 'month':
-                        self._dates.append(Date([word.prev.prev, word.prev, word]))
-                    if word.prev.type == 'day-month':
-                        self._dates.append(Date([word.prev, word]))
-                for vehicle in self.library.vehicles:
-                    if word.looks_like(vehicle.vin):
-                        wx.MessageBox(f'{word.text} looks a lot like {vehicle.vin}', f'{vehicle} Detected!', wx.OK | wx.ICON_INFORMATION)
-                    elif hasattr(vehicle, 'plates'):
-                        for plate in vehicle.plates:
-                            if word.looks_like(plate.number):
-                                wx.MessageBox(f'{word.text} looks a lot like {plate.number}', f'{vehicle} Detected!', wx.OK | wx.ICON_INFORMATION)
-            wx.LogDebug("Done looking for dates")
+        if self._dates is None:
+            self.extract()
         return self._dates
 
     @property
@@ -318,6 +381,8 @@ class Document():
 
     @property
     def folder_path(self):
+        if self._folder_path:
+            return self._folder_path
         wx.LogDebug('Document.folder_path()')
         wx.LogDebug(f'Document.folder_path(): lib_dir: {self.lib_dir}')
         wx.LogDebug(f'Document.folder_path(): year: {self.year}')
@@ -330,6 +395,7 @@ class Document():
                             self.day,
                             self.id)
         wx.LogDebug(f'Document.folder_path(): path: {path}')
+        self._folder_path = path
         return path
 
     @property
@@ -340,7 +406,9 @@ class Document():
 
     @json_path.setter
     def json_path(self, value):
-        self.folder_path = os.path.dirname(value)
+        self._json_path = value
+        self._folder_path = os.path.dirname(value)
+        self.id = os.path.basename(self._folder_path)
 
     @property
     def original_path(self):
@@ -350,6 +418,10 @@ class Document():
     def thumb_path(self):
         return os.path.join(self.folder_path, 'thumbnail.webp')
 
+    @property
+    def ocr_path(self):
+        return os.path.join(self.folder_path, 'ocr.npz')
+
     @property
     def processed_path(self):
         return os.path.join(self.folder_path, 'processed.pdf')
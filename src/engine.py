@@ -0,0 +1,164 @@
+import io
+import os
+import pypdf
+import tempfile
+import subprocess
+import multiprocessing
+import pytesseract
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pytesseract.pytesseract import file_to_dict
+
+from .image import Image
+
+
+# tmpfs where we have one, so Tesseract's output never touches a disk
+SCRATCH = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+###############################################################################
+# Worker Process
+###############################################################################
+
+def _init_worker():
+    # Each worker already has a core to itself.  Stop Tesseract's OpenMP
+    # threads from fighting the other workers for it.
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+
+
+def tesseract(pil_image):
+    """
+    OCR a single page
+
+    The raster is piped to Tesseract's stdin as uncompressed PNM rather than
+    being encoded to an image file first.  Returns the TSV and Sandwich PDF.
+    """
+    if pil_image.mode not in ('1', 'L', 'RGB'):
+        pil_image = pil_image.convert('RGB')
+    raster = io.BytesIO()
+    pil_image.save(raster, format='PPM')
+    with tempfile.TemporaryDirectory(prefix='pantomath-', dir=SCRATCH) as scratch:
+        base = os.path.join(scratch, 'page')
+        command = [pytesseract.pytesseract.tesseract_cmd, 'stdin', base]
+        # PNM can't carry a resolution, so pass along whatever we were given
+        if dpi := pil_image.info.get('dpi'):
+            command += ['--dpi', str(round(dpi[0]))]
+        command += ['tsv', 'pdf']
+        subprocess.run(command, input=raster.getvalue(), capture_output=True, check=True)
+        with open(f'{base}.tsv', 'r', encoding='utf-8') as file:
+            tsv = file.read()
+        with open(f'{base}.pdf', 'rb') as file:
+            pdf = file.read()
+    return tsv, pdf
+
+
+def process_page(pil_image, thumbnail=False):
+    """
+    Deskew, autocrop and OCR a single page
+
+    Returns the page's layout data, its Sandwich PDF, and optionally a
+    thumbnail of the processed page
+    """
+    page = Image(pil_image).lazy().deskew().autocrop().run()
+    tsv, pdf = tesseract(page.pil_image)
+    thumb = page.thumbnail().pil_image if thumbnail else None
+    return file_to_dict(tsv, '\t', -1), pdf, thumb
+
+
+###############################################################################
+# Reassembly
+###############################################################################
+
+def collect(futures):
+    """
+    Yields each Future's result, in order
+
+    If one fails, or the caller stops early, the rest are cancelled.
+    """
+    try:
+        for future in futures:
+            yield future.result()
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+
+
+def merge_data(datas):
+    """
+    Concatenate per-page image_to_data dicts, renumbering pages in order
+    """
+    merged = {}
+    for page_num, data in enumerate(datas, start=1):
+        if 'page_num' in data:
+            data['page_num'] = [page_num] * len(data['page_num'])
+        for key, values in data.items():
+            merged.setdefault(key, []).extend(values)
+    return merged
+
+
+def merge_pdfs(pdfs):
+    if len(pdfs) == 1:
+        return pdfs[0]
+    writer = pypdf.PdfWriter()
+    for pdf in pdfs:
+        writer.append(pypdf.PdfReader(io.BytesIO(pdf)))
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+###############################################################################
+# Engine
+###############################################################################
+
+class Engine():
+    """
+    Fans pages out to a pool of worker processes and hands back the results
+    in page order
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count()
+        self._pool = None
+
+    @property
+    def pool(self):
+        # Spawn rather than fork: forking a process that's running a wx main
+        # loop and a scanner thread is asking for trouble.
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers,
+                                             mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_init_worker)
+        return self._pool
+
+    def submit(self, pil_image, thumbnail=False):
+        """
+        Start processing one page now
+
+        Returns a Future of its (data, pdf, thumb)
+        """
+        return self.pool.submit(process_page, pil_image, thumbnail)
+
+    def process(self, pages, window=None):
+        """
+        Takes in an iterable of Images
+        Yields (data, pdf, thumb) for each of them, in order
+
+        Only pulls the next page from the iterable once fewer than window
+        pages are in flight, so a lazy iterable is never fully materialized.
+        """
+        window = window or 2 * self.workers
+        pending = deque()
+        for i, page in enumerate(pages):
+            pending.append(self.submit(page.pil_image, i == 0))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
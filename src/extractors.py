@@ -0,0 +1,97 @@
+import wx
+
+from .date import line_dates
+
+
+class Extractor():
+    """
+    Finds one kind of entity in a Document
+
+    Subclasses register themselves by KIND and are handed each line, then
+    each of its words, in one shared pass over the Document.  They must not
+    touch the UI: extraction runs wherever the import does.
+    """
+
+    KIND = None
+    EXTRACTORS = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.KIND:
+            Extractor.EXTRACTORS[cls.KIND] = cls
+
+    def __init__(self, document):
+        self.document = document
+        self.entities = []
+
+    def line(self, line):
+        pass
+
+    def word(self, word):
+        pass
+
+    def add(self, value, words, **extra):
+        """
+        Record an entity as a JSON-friendly dict
+        """
+        self.entities.append({'kind': self.KIND,
+                              'value': value,
+                              'text': ' '.join(word.text for word in words),
+                              'words': [word.index for word in words],
+                              **extra})
+
+
+def extract(document):
+    """
+    Runs every registered Extractor over document in a single pass
+
+    Returns {kind: Extractor}
+    """
+    wx.LogDebug(f'extract({document.id})')
+    extractors = {kind: cls(document) for kind, cls in Extractor.EXTRACTORS.items()}
+    for line in document.lines:
+        for extractor in extractors.values():
+            extractor.line(line)
+        for word in line.words:
+            for extractor in extractors.values():
+                extractor.word(word)
+    return extractors
+
+
+###############################################################################
+# Extractors
+###############################################################################
+
+class DateExtractor(Extractor):
+    KIND = 'date'
+
+    def __init__(self, document):
+        super().__init__(document)
+        self.dates = []
+
+    def line(self, line):
+        for date in line_dates(line.words):
+            self.dates.append(date)
+            self.add(date.dt.date().isoformat(), date.words)
+
+
+class VehicleExtractor(Extractor):
+    KIND = 'vehicle'
+
+    def __init__(self, document):
+        super().__init__(document)
+        self.index = document.library.vehicle_index
+        self._matches = {}
+
+    def word(self, word):
+        text = word.text
+        if text not in self._matches:
+            self._matches[text] = self.index.match(text)
+        # A VIN match is enough; only fall back to plates without one
+        by_vin = set()
+        for key, vehicle, score in self._matches[text]:
+            if key == vehicle.vin:
+                by_vin.add(vehicle)
+            elif vehicle in by_vin:
+                continue
+            self.add(vehicle.vin, [word], match=key, score=score, vehicle=str(vehicle))
@@ -0,0 +1,88 @@
+import os
+
+
+class DocumentHandle():
+    """
+    What the Library holds on to for each Document
+
+    Only the fields the Index has.  Anything else is looked up on the full
+    Document, which the Library loads on first use and may evict again.
+    """
+
+    __slots__ = ('library', 'id', 'md5', 'date', 'imported', 'folder_path', 'original')
+
+    def __init__(self, library, id, md5=None, date='', imported='', folder_path=None, original=None):
+        self.library = library
+        self.id = id
+        self.md5 = md5
+        self.date = date
+        self.imported = imported
+        self.folder_path = folder_path
+        self.original = original
+
+    @classmethod
+    def from_row(cls, library, row):
+        return cls(library,
+                   row['id'],
+                   row['md5'],
+                   row['date'],
+                   row['imported'],
+                   os.path.join(library.dir, row['folder']),
+                   row['original'])
+
+    @classmethod
+    def from_document(cls, library, doc):
+        handle = cls(library, doc.id)
+        handle.update(doc)
+        return handle
+
+    def update(self, doc):
+        """
+        Pick up any changes to doc's indexed fields
+        """
+        self.md5 = doc.md5
+        self.date = str(doc.json.get('date', ''))
+        self.imported = str(doc.json.get('imported', ''))
+        self.folder_path = doc.folder_path
+        self.original = doc.json.get('original')
+
+    def __repr__(self):
+        return f'DocumentHandle({self.id})'
+
+    def __getattr__(self, name):
+        # Only called for what isn't a slot or property here
+        if name in self.__slots__:
+            raise AttributeError(name)
+        return getattr(self.document, name)
+
+    ###########################################################################
+    # Properties
+    ###########################################################################
+
+    @property
+    def document(self):
+        """
+        The full Document, loaded if it isn't already
+        """
+        return self.library.materialize(self)
+
+    @property
+    def json_path(self):
+        return os.path.join(self.folder_path, 'props.json')
+
+    @property
+    def thumb_path(self):
+        return os.path.join(self.folder_path, 'thumbnail.webp')
+
+    @property
+    def processed_path(self):
+        return os.path.join(self.folder_path, 'processed.pdf')
+
+    @property
+    def ocr_path(self):
+        return os.path.join(self.folder_path, 'ocr.npz')
+
+    @property
+    def original_path(self):
+        if self.original:
+            return os.path.join(self.folder_path, self.original)
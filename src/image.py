@@ -1,10 +1,16 @@
 import PIL.Image
+import math
 import types
+import numpy as np
 import wx
 
 from PIL import ImageOps, ImageFilter
-from itertools import chain, product
-from functools import partial
+from functools import partial, lru_cache
+
+
+@lru_cache
+def threshold_lut(thresh, bands=1):
+    return [255 if p > thresh else 0 for p in range(256)] * bands
 
 
 class Image():
@@ -69,7 +75,8 @@ class Image():
     ###########################################################################
 
     def threshold(self, thresh=127):
-        return Image(self.pil_image.point(lambda p: 255 if p > thresh else 0))
+        bands = len(self.pil_image.getbands())
+        return Image(self.pil_image.point(threshold_lut(thresh, bands)))
 
     ###########################################################################
     # Chainable thumbnail()
@@ -81,28 +88,84 @@ class Image():
         return Image(copy)
 
     ###########################################################################
-    # Contiguous Areas: Letters, Pictures, Lines, etc.
+    # Deferred, fused operation chains
     ###########################################################################
 
-    def regions(self, test):
-        pixel = self.pil_image.load()
-        wx.LogDebug("&&&&&&&&&&&&&&&&&&&&&", self.pil_image.size)
-        xs, ys = map(range, self.pil_image.size)
-        pixels = set(xy for xy in product(xs, ys) if test(pixel[xy]))
-        while pixels:
-            region = set()
-            edge = set([pixels.pop()])
-            while edge:
-                region |= edge
-                pixels -= edge
-                edge = pixels.intersection(
-                    chain.from_iterable(((x-1,y),(x,y-1),(x+1,y),(x,y+1)) for x,y in edge)
-                )
-            yield Region(region)
+    def lazy(self):
+        return Pipeline(self)
+
+    ###########################################################################
+    # Contiguous Areas: Letters, Pictures, Lines, etc.
+    ###########################################################################
 
-    def test(self, pixel):
-        r, g, b = pixel
-        return r < 10 and g < 10 and b < 10
+    def regions(self, test=None):
+        """
+        Yields the 4-connected Regions of pixels that pass test
+
+        test maps an array of pixels to a boolean mask and defaults to
+        Image.test.  Pixels are labeled a run at a time: each horizontal run
+        is joined to the runs it overlaps in the row above, and the joins are
+        resolved with a vectorized union-find.
+        """
+        mask = (test or self.test)(np.asarray(self.pil_image))
+        height, width = mask.shape
+
+        # Runs of masked pixels: [starts, ends) on each of rows
+        padded = np.zeros((height, width + 2), dtype=np.int8)
+        padded[:, 1:-1] = mask
+        edges = np.diff(padded, axis=1)
+        rows, starts = np.nonzero(edges == 1)
+        ends = np.nonzero(edges == -1)[1]
+        if not len(rows):
+            return
+
+        # The runs in the row above that overlap each run form one
+        # contiguous slice of the (row-major) run list: [lo, hi)
+        key = width + 1
+        lo = np.searchsorted(rows * key + ends, (rows - 1) * key + starts, side='right')
+        hi = np.searchsorted(rows * key + starts, (rows - 1) * key + ends, side='left')
+        counts = np.maximum(hi - lo, 0)
+        below = np.repeat(np.arange(len(rows)), counts)
+        above = np.repeat(lo - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+
+        # Union-find: hook every run (and its root) onto the lowest label it
+        # touches, then pointer-jump until nothing changes
+        labels = np.arange(len(rows))
+        while True:
+            previous = labels
+            lowest = np.minimum(labels[below], labels[above])
+            labels = labels.copy()
+            for runs in (below, above, previous[below], previous[above]):
+                np.minimum.at(labels, runs, lowest)
+            while not np.array_equal(labels, labels[labels]):
+                labels = labels[labels]
+            if np.array_equal(labels, previous):
+                break
+        labels = np.unique(labels, return_inverse=True)[1]
+
+        n = labels.max() + 1
+        lengths = ends - starts
+        sizes = np.bincount(labels, lengths, n)
+        lefts = np.full(n, width)
+        np.minimum.at(lefts, labels, starts)
+        rights = np.zeros(n, dtype=np.intp)
+        np.maximum.at(rights, labels, ends - 1)
+        tops = np.full(n, height)
+        np.minimum.at(tops, labels, rows)
+        bottoms = np.zeros(n, dtype=np.intp)
+        np.maximum.at(bottoms, labels, rows)
+        xs = np.bincount(labels, (starts + ends - 1) * lengths / 2, n) / sizes
+        ys = np.bincount(labels, rows * lengths, n) / sizes
+        for i in range(n):
+            yield Region((int(lefts[i]), int(tops[i]), int(rights[i]), int(bottoms[i])),
+                         int(sizes[i]),
+                         (float(xs[i]), float(ys[i])))
+
+    def test(self, pixels):
+        # Near-black
+        if pixels.ndim == 3:
+            return (pixels[..., :3] < 10).all(axis=-1)
+        return pixels < 10
 
     ###########################################################################
     # Skew & Bounding Box
@@ -122,61 +185,57 @@ class Image():
             wx.LogDebug(f'Skew: {self._skew}, BBox: {self._bbox}')
         return self._bbox
 
-    def get_skew_and_bbox(self, minimum=-45, maximum=45, step=1):
-        guess = 0
-        dir = 1
-
-        # image = self.crop(20).filter(ImageFilter.GaussianBlur(1)).threshold(210)
-        # regions = image.regions(image.test)
-        # draw = ImageDraw.Draw(image.pil_image)
-        # for region in regions:
-        #     if region.bigger_than(5):
-        #         draw.rectangle(region.bbox(), outline=(255, 0, 0))
-        #         wx.LogDebug(region.bbox())
-        # image.show()
-        # return
-
-        image = self.crop(20).filter(ImageFilter.GaussianBlur(10)).threshold(210)
-        orig_image = self.crop(20).thumbnail((400, 400)).filter(ImageFilter.GaussianBlur(1))
-        orig_image = orig_image.threshold(210)
-        orig_image = orig_image.invert()
-        orig_image = orig_image.filter(ImageFilter.MaxFilter(3))
-        orig_image = orig_image.filter(ImageFilter.MaxFilter(3))
-        if orig_image.getbbox():
-            left, upper, right, lower = orig_image.getbbox()
-        else:
-            wx.LogDebug('Got None for bbox -- returning 0 skew and full image size')
-            return 0, (0, 0, orig_image.width, orig_image.height)
-        prev_area = (lower-upper)*(right-left)
-        equal_count = 0
-        # wx.LogDebug(min, guess, max, prev_area, lower, upper, right, left)
-        while minimum <= guess <= maximum:
-            guess += step*dir
-            image = orig_image.rotate(guess)
-            bbox = image.getbbox()
-            # draw = ImageDraw.Draw(image.pil_image)
-            # draw.rectangle(image.getbbox(), outline=(0, 255, 0))
-            # image.show()
-            # (Lower - Upper) * (Right - Left)
-            if bbox:
-                area = (bbox[3]-bbox[1])*(bbox[2]-bbox[0])
-            else:
-                wx.LogDebug('Bbox went away -- setting area to entire image')
-                area = orig_image.width * orig_image.height
-            # wx.LogDebug(min, guess, max, area, prev_area, lower, upper, right, left)
-            if area > prev_area:
-                if equal_count and bbox:
-                    angle = guess - dir*step*equal_count/2
-                    # wx.LogDebug(f'################################################ {self.size}')
-                    bbox = [i * max(self.size) / 400 for i in bbox]
-                    return angle, bbox
-                dir *= -1
-                step *= 1/2
-            elif area == prev_area:
-                equal_count += 1
-            prev_area = area
-        wx.LogDebug(f'No skew ({minimum}, {maximum}) is better than the original')
-        return 0, orig_image.getbbox()
+    def get_skew_and_bbox(self, minimum=-45, maximum=45, step=1, border=20, size=400):
+        """
+        Projection-profile skew estimate
+
+        The ink in a small thumbnail is projected onto the y axis at every
+        candidate angle in one batch.  Lines of text stack up, and the
+        profile is spikiest, when the page is rotated by its skew.  The best
+        coarse angle is then refined to a tenth of a step.
+
+        Returns the angle to rotate() by and the bbox of the content in the
+        rotated full-size image.
+        """
+        small = self.lazy().crop(border).thumbnail((size, size)).convert('L')
+        small = small.filter(ImageFilter.GaussianBlur(1)).run()
+        ys, xs = np.nonzero(np.asarray(small.pil_image) < 210)
+        if not len(xs):
+            wx.LogDebug('No ink found -- returning 0 skew and full image size')
+            return 0, (0, 0, self.width, self.height)
+
+        # Small pixels -> full-size coordinates around the center of rotation
+        scale = (self.width - 2 * border) / small.width
+        xs = ((xs + 0.5) * scale + border - self.width / 2).astype(np.float32)
+        ys = ((ys + 0.5) * scale + border - self.height / 2).astype(np.float32)
+
+        def scores(angles, xs=xs, ys=ys):
+            theta = np.radians(angles, dtype=np.float32)[:, np.newaxis]
+            rows = (ys * np.cos(theta) - xs * np.sin(theta)) / scale
+            rows = np.rint(rows - rows.min(axis=1, keepdims=True)).astype(np.intp)
+            bins = rows.max() + 1
+            rows += np.arange(len(angles))[:, np.newaxis] * bins
+            profiles = np.bincount(rows.ravel(), minlength=len(angles) * bins)
+            return np.square(profiles.reshape(len(angles), bins), dtype=np.float64).sum(axis=1)
+
+        # A random sample of the ink is plenty to find the right neighbourhood.
+        # A regular stride would alias with the pixel grid.
+        sample = np.random.default_rng(0).permutation(len(xs))[:10000]
+        angles = np.arange(minimum, maximum + step, step, dtype=np.float32)
+        angle = angles[np.argmax(scores(angles, xs[sample], ys[sample]))]
+        angles = np.linspace(angle - step, angle + step, 21, dtype=np.float32)
+        angle = float(angles[np.argmax(scores(angles))])
+
+        # Where the ink lands once rotate(angle) has been applied
+        theta = np.radians(angle)
+        rx = xs * np.cos(theta) + ys * np.sin(theta) + self.width / 2
+        ry = ys * np.cos(theta) - xs * np.sin(theta) + self.height / 2
+        pad = 2 * scale
+        bbox = (max(0, int(rx.min() - pad)),
+                max(0, int(ry.min() - pad)),
+                min(self.width, int(np.ceil(rx.max() + pad))),
+                min(self.height, int(np.ceil(ry.max() + pad))))
+        return angle, bbox
 
     def deskew(self, minimum=-45, maximum=45, step=1):
         image = self.rotate(self.skew())
@@ -187,15 +246,176 @@ class Image():
         return self.pil_image.crop(self.bbox())
 
 
-class Region():
-    def __init__(self, pixels):
-        self.pixels = pixels
+class Pipeline():
+    """
+    A chain of Image operations that only runs when run() is called
+
+    Takes the same chainable calls as Image.  Seeing the whole chain up
+    front lets run() fuse steps that would each allocate a full-size
+    intermediate:
+
+    - point(table), threshold() and invert() become a single lookup table
+    - back-to-back MaxFilters (or MinFilters) become one bigger filter
+    - crop(border) + thumbnail() becomes one reducing resize() of the box
+    - deskew() + autocrop() becomes one affine transform of just the box
+    """
+
+    LUT_MODES = ('L', 'RGB')
+
+    def __init__(self, image):
+        self.image = image
+        self.ops = []
         self._bbox = None
 
-    def bbox(self):
+    def __getattr__(self, name):
+        if hasattr(ImageOps, name) or hasattr(PIL.Image.Image, name):
+            return partial(self._record, name)
+        raise AttributeError(name)
+
+    def _record(self, name, *args, **kwargs):
+        self.ops.append((name, args, kwargs))
+        return self
+
+    ###########################################################################
+    # Operations that need more than a pass-through
+    ###########################################################################
+
+    def threshold(self, thresh=127):
+        return self._record('threshold', thresh)
+
+    def thumbnail(self, size=(200, 200)):
+        return self._record('thumbnail', size)
+
+    def deskew(self):
+        # Skew detection has to look at the pixels, so settle what's queued
+        self.image = self.run()
+        self.ops = []
+        self._bbox = self.image.bbox()
+        return self._record('rotate', self.image.skew())
+
+    def autocrop(self):
         if self._bbox is None:
-            xs, ys = zip(*self.pixels)
-            self._bbox = min(xs), min(ys), max(xs), max(ys)
+            self.image = self.run()
+            self.ops = []
+            self._bbox = self.image.bbox()
+        return self._record('box', tuple(self._bbox))
+
+    ###########################################################################
+    # Execution
+    ###########################################################################
+
+    def run(self):
+        pil_image = self.image.pil_image
+        ops = self.ops
+        i = 0
+        while i < len(ops):
+            name, args, kwargs = ops[i]
+            following = ops[i + 1][0] if i + 1 < len(ops) else None
+            if name == 'crop' and following == 'thumbnail' and not kwargs:
+                box = _border_box(pil_image, *args)
+                pil_image = _shrink(pil_image, *ops[i + 1][1], box=box)
+                i += 2
+            elif name == 'rotate' and following == 'box' and len(args) == 1 and not kwargs:
+                pil_image = _rotate_box(pil_image, args[0], *ops[i + 1][1])
+                i += 2
+            elif _is_lut(ops[i]) and pil_image.mode in self.LUT_MODES:
+                bands = len(pil_image.getbands())
+                lut = list(range(256)) * bands
+                while i < len(ops) and _is_lut(ops[i]):
+                    lut = _compose_lut(lut, ops[i], bands)
+                    i += 1
+                pil_image = pil_image.point(lut)
+            elif name == 'filter' and _rank_filter(args[0]):
+                size = args[0].size
+                i += 1
+                while i < len(ops) and ops[i][0] == 'filter' and type(ops[i][1][0]) is type(args[0]):
+                    size += ops[i][1][0].size - 1
+                    i += 1
+                pil_image = pil_image.filter(type(args[0])(size))
+            else:
+                pil_image = _apply(pil_image, name, args, kwargs)
+                i += 1
+        return Image(pil_image)
+
+
+def _border_box(pil_image, border=0):
+    return (border, border, pil_image.width - border, pil_image.height - border)
+
+
+def _shrink(pil_image, size, box=None):
+    # thumbnail() without the copy, and optionally only looking at box
+    box = box or (0, 0, pil_image.width, pil_image.height)
+    width, height = box[2] - box[0], box[3] - box[1]
+    scale = min(1, size[0] / width, size[1] / height)
+    return pil_image.resize((max(1, round(width * scale)), max(1, round(height * scale))),
+                            PIL.Image.BICUBIC,
+                            box=box,
+                            reducing_gap=2.0)
+
+
+def _rotate_box(pil_image, angle, box):
+    # The affine transform rotate() would do, shifted so only box comes out
+    theta = -math.radians(angle % 360.0)
+    a, b = round(math.cos(theta), 15), round(math.sin(theta), 15)
+    d, e = -b, a
+    cx, cy = pil_image.width / 2.0, pil_image.height / 2.0
+    c = a * -cx + b * -cy + cx
+    f = d * -cx + e * -cy + cy
+    left, top, right, bottom = (round(edge) for edge in box)
+    matrix = (a, b, a * left + b * top + c,
+              d, e, d * left + e * top + f)
+    return pil_image.transform((right - left, bottom - top),
+                               PIL.Image.AFFINE,
+                               matrix,
+                               PIL.Image.NEAREST)
+
+
+def _is_lut(op):
+    name, args, kwargs = op
+    if kwargs:
+        return False
+    return (name == 'threshold'
+            or (name == 'invert' and not args)
+            or (name == 'point' and len(args) == 1 and (callable(args[0]) or isinstance(args[0], list))))
+
+
+def _compose_lut(lut, op, bands):
+    name, args, kwargs = op
+    if name == 'threshold':
+        table = threshold_lut(*args, bands)
+    elif name == 'invert':
+        table = [255 - p for p in range(256)] * bands
+    elif callable(args[0]):
+        table = [min(255, max(0, round(args[0](p)))) for p in range(256)] * bands
+    else:
+        table = args[0] if len(args[0]) == 256 * bands else args[0] * bands
+    return [table[band * 256 + value] for band in range(bands) for value in lut[band * 256:band * 256 + 256]]
+
+
+def _rank_filter(filter):
+    return type(filter) in (ImageFilter.MaxFilter, ImageFilter.MinFilter)
+
+
+def _apply(pil_image, name, args, kwargs):
+    if name == 'threshold':
+        return pil_image.point(threshold_lut(*args, len(pil_image.getbands())))
+    elif name == 'thumbnail':
+        return _shrink(pil_image, *args)
+    elif name == 'box':
+        return pil_image.crop(*args)
+    elif hasattr(ImageOps, name):
+        return ImageOps.__getattribute__(name)(pil_image, *args, **kwargs)
+    result = pil_image.__getattribute__(name)(*args, **kwargs)
+    return result if isinstance(result, PIL.Image.Image) else pil_image
+
+
+class Region():
+    def __init__(self, bbox, size, centroid):
+        self._bbox = bbox
+        self.size = size
+        self.centroid = centroid
+
+    def bbox(self):
         return self._bbox
 
     def wider_than(self, width):
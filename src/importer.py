@@ -0,0 +1,109 @@
+import wx
+import queue
+import itertools
+import threading
+
+from functools import partial
+
+
+class Job():
+    def __init__(self, label, function, args, callback):
+        self.label = label
+        self.function = function
+        self.args = args
+        self.callback = callback
+
+
+class Importer():
+    """
+    Runs Library imports on background threads
+
+    Lower priorities are taken first so pages coming off the scanner never
+    wait behind a bulk Inbox import.  Progress is reported to the status bar
+    through wx.CallAfter, and frame.OnImported(doc) is called on the main
+    thread for every Document that makes it into the Library.
+    """
+
+    SCAN = 0
+    INTERACTIVE = 1
+    INBOX = 2
+
+    STATUS_FIELD = 2  # Its own field, so idling clears nothing else
+
+    def __init__(self, frame, workers=2):
+        self.frame = frame
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._status = {}
+        for n in range(workers):
+            threading.Thread(target=self._work, name=f'Importer-{n}', daemon=True).start()
+
+    ###########################################################################
+    # Public Methods
+    ###########################################################################
+
+    def submit(self, priority, label, function, *args, callback=None):
+        """
+        Queue function(*args, progress=...) to run on a worker thread
+
+        callback, if given, is called on the main thread with the result.
+        """
+        wx.LogDebug(f'Importer.submit({priority}, {label})')
+        job = Job(label, function, args, callback)
+        self._queue.put((priority, next(self._counter), job))
+        self._update_status()
+        return job
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    ###########################################################################
+    # Worker Threads
+    ###########################################################################
+
+    def _work(self):
+        while True:
+            priority, seq, job = self._queue.get()
+            progress = partial(self._progress, job)
+            progress('Starting')
+            try:
+                result = job.function(*job.args, progress=progress)
+            except Exception as e:
+                wx.LogDebug(f'Importer: {job.label} failed: {e!r}')
+                wx.CallAfter(wx.LogError, f'Importing {job.label} failed: {e}')
+                result = None
+            with self._lock:
+                del self._status[job]
+            self._update_status()
+            if result:
+                wx.CallAfter(self.frame.OnImported, result)
+            if job.callback:
+                wx.CallAfter(job.callback, result)
+            self._queue.task_done()
+
+    ###########################################################################
+    # Status Management
+    ###########################################################################
+
+    def _progress(self, job, text):
+        with self._lock:
+            self._status[job] = text
+        self._update_status(job)
+
+    def _update_status(self, job=None):
+        with self._lock:
+            if job not in self._status:
+                job = next(reversed(self._status), None)
+            if job:
+                text = f'Importing {job.label}: {self._status[job]}'
+                if len(self._status) > 1:
+                    text += f' (+{len(self._status) - 1} running)'
+            else:
+                text = 'Imports'
+        if self.pending:
+            text += f' ({self.pending} queued)'
+        elif text == 'Imports':
+            text = ''
+        wx.CallAfter(self.frame.SetStatusText, text, self.STATUS_FIELD)
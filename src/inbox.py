@@ -0,0 +1,108 @@
+import wx
+import os
+import time
+
+from collections import deque
+from functools import partial
+
+from .importer import Importer
+
+
+class Inbox():
+    """
+    Watches a folder and imports whatever lands in it
+
+    Each file is imported once its size and mtime have held still for
+    SETTLE seconds, however busy the rest of the folder is.  Filesystem
+    events only mark a file as worth looking at; one timer does all the
+    checking.  wx doesn't report close-after-write, so stability is the
+    only signal we get.  Settled files go to the Importer a batch at a
+    time, with no more than max_jobs of them queued or running at once.
+    """
+
+    SETTLE = 2.0   # seconds
+    POLL = 500     # milliseconds
+    BATCH = 16     # files handed over per tick
+
+    def __init__(self, frame, dir, max_jobs=8):
+        self.frame = frame
+        self.dir = dir
+        self.max_jobs = max_jobs
+        os.makedirs(self.dir, exist_ok=True)
+
+        self._pending = {}      # {path: (size, mtime, unchanged since)}
+        self._ready = deque()   # Settled, waiting for room in the Importer
+        self._jobs = set()      # Handed to the Importer and not back yet
+
+        self._timer = wx.Timer(frame)
+        frame.Bind(wx.EVT_TIMER, self.OnTimer, self._timer)
+
+        self._watcher = wx.FileSystemWatcher()
+        self._watcher.Bind(wx.EVT_FSWATCHER, self.OnFSEvent)
+        self._watcher.Add(self.dir)
+
+    ###########################################################################
+    # Event Handlers
+    ###########################################################################
+
+    def OnFSEvent(self, event):
+        change = event.GetChangeType()
+        if change & (wx.FSW_EVENT_CREATE | wx.FSW_EVENT_MODIFY):
+            self.touch(event.GetPath().GetFullPath())
+        elif change & wx.FSW_EVENT_RENAME:
+            self.touch(event.GetNewPath().GetFullPath())
+
+    def OnTimer(self, event):
+        now = time.monotonic()
+        for path, (size, mtime, since) in list(self._pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                wx.LogDebug(f'Inbox: {path} no longer exists.  It was probably a browser temp file')
+                del self._pending[path]
+                continue
+            if (stat.st_size, stat.st_mtime) != (size, mtime):
+                self._pending[path] = (stat.st_size, stat.st_mtime, now)
+            elif now - since >= self.SETTLE:
+                del self._pending[path]
+                self._ready.append(path)
+        self.dispatch()
+        if not self._pending and not self._ready:
+            self._timer.Stop()
+
+    ###########################################################################
+    # Public Methods
+    ###########################################################################
+
+    def touch(self, path):
+        """
+        Note that path has changed and start waiting for it to settle
+        """
+        if not os.path.isfile(path) or path in self._jobs or path in self._ready:
+            return
+        self._pending[path] = (None, None, time.monotonic())
+        if not self._timer.IsRunning():
+            self._timer.Start(self.POLL)
+
+    def dispatch(self):
+        """
+        Hand settled files to the Importer while there's room
+        """
+        for n in range(self.BATCH):
+            if not self._ready or len(self._jobs) >= self.max_jobs:
+                break
+            path = self._ready.popleft()
+            wx.LogDebug(f'Queueing {path}')
+            self._jobs.add(path)
+            self.frame.importer.submit(Importer.INBOX,
+                                       os.path.basename(path),
+                                       self.frame.library.import_file,
+                                       path,
+                                       callback=partial(self.OnImported, path))
+
+    def OnImported(self, path, doc):
+        self._jobs.discard(path)
+        if doc and self.frame.config.ReadBool("/Import/RemoveSource", False):
+            wx.LogDebug(f'Removing {path}')
+            os.remove(path)
+        self.dispatch()
@@ -0,0 +1,318 @@
+import wx
+import os
+import string
+import sqlite3
+import threading
+
+from contextlib import contextmanager
+from thefuzz import fuzz
+
+
+class Index():
+    """
+    Persistent SQLite catalog of every Document in a Library
+    """
+
+    FILENAME = 'index.sqlite'
+    FUZZY_RATIO = 75
+    FUZZY_TERMS = 100
+    SCHEMA_VERSION = 4
+    SCHEMA = """
+        DROP TABLE IF EXISTS thumbnails;
+        DROP TABLE IF EXISTS grams;
+        DROP TABLE IF EXISTS postings;
+        DROP TABLE IF EXISTS terms;
+        DROP TABLE IF EXISTS entities;
+        DROP TABLE IF EXISTS documents;
+        CREATE TABLE documents (
+            id       TEXT PRIMARY KEY,
+            md5      TEXT,
+            date     TEXT,
+            imported TEXT,
+            folder   TEXT NOT NULL,
+            original TEXT
+        );
+        CREATE INDEX documents_md5 ON documents (md5);
+        CREATE INDEX documents_date ON documents (date);
+        CREATE TABLE entities (
+            doc   TEXT NOT NULL,
+            kind  TEXT NOT NULL,
+            value TEXT,
+            text  TEXT
+        );
+        CREATE INDEX entities_doc ON entities (doc);
+        CREATE INDEX entities_kind_value ON entities (kind, value);
+        CREATE TABLE terms (
+            id     INTEGER PRIMARY KEY,
+            term   TEXT NOT NULL UNIQUE,
+            length INTEGER NOT NULL
+        );
+        CREATE TABLE postings (
+            term INTEGER NOT NULL,
+            doc  TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            word INTEGER NOT NULL
+        );
+        CREATE INDEX postings_term ON postings (term, doc);
+        CREATE INDEX postings_doc ON postings (doc);
+        CREATE TABLE grams (
+            gram TEXT NOT NULL,
+            term INTEGER NOT NULL
+        );
+        CREATE INDEX grams_gram ON grams (gram);
+        CREATE TABLE thumbnails (
+            doc    TEXT PRIMARY KEY,
+            slot   INTEGER NOT NULL UNIQUE,
+            width  INTEGER NOT NULL,
+            height INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, dir):
+        self.dir = dir
+        self.path = os.path.join(dir, self.FILENAME)
+        self.created = not os.path.exists(self.path)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        # Everything in here can be rebuilt from the Library, so trade a
+        # little durability for not syncing the disk on every commit
+        self._conn.execute('PRAGMA journal_mode = WAL')
+        self._conn.execute('PRAGMA synchronous = NORMAL')
+        version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != self.SCHEMA_VERSION:
+            wx.LogDebug(f'Index schema is v{version}, want v{self.SCHEMA_VERSION}.  Recreating.')
+            self._conn.executescript(self.SCHEMA)
+            self._conn.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+            self._conn.commit()
+            self.created = True
+
+    ###########################################################################
+    # Transactions
+    ###########################################################################
+
+    @contextmanager
+    def transaction(self):
+        """
+        Nestable transaction.  Only the outermost one commits or rolls back.
+        """
+        with self._lock:
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if not self._depth:
+                    self._conn.rollback()
+                raise
+            else:
+                self._depth -= 1
+                if not self._depth:
+                    self._conn.commit()
+
+    def execute(self, sql, params=()):
+        with self.transaction():
+            return self._conn.execute(sql, params)
+
+    ###########################################################################
+    # Documents
+    ###########################################################################
+
+    def rows(self):
+        with self._lock:
+            return self._conn.execute('SELECT * FROM documents ORDER BY date').fetchall()
+
+    def update(self, doc):
+        wx.LogDebug(f'Index.update({doc.id})')
+        self.execute("""
+            INSERT INTO documents (id, md5, date, imported, folder, original)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET
+                md5 = excluded.md5,
+                date = excluded.date,
+                imported = excluded.imported,
+                folder = excluded.folder,
+                original = excluded.original
+        """, (doc.id,
+              doc.md5,
+              str(doc.json.get('date', '')),
+              str(doc.json.get('imported', '')),
+              os.path.relpath(doc.folder_path, self.dir),
+              doc.json.get('original')))
+        self.update_entities(doc)
+
+    def remove(self, id):
+        with self.transaction():
+            self.execute('DELETE FROM thumbnails WHERE doc = ?', (id,))
+            self.execute('DELETE FROM postings WHERE doc = ?', (id,))
+            self.execute('DELETE FROM entities WHERE doc = ?', (id,))
+            self.execute('DELETE FROM documents WHERE id = ?', (id,))
+
+    def clear(self):
+        with self.transaction():
+            self.execute('DELETE FROM entities')
+            self.execute('DELETE FROM documents')
+
+    ###########################################################################
+    # Entities
+    ###########################################################################
+
+    def update_entities(self, doc):
+        entities = doc.json.get('entities')
+        if entities is None:
+            return
+        with self.transaction():
+            self.execute('DELETE FROM entities WHERE doc = ?', (doc.id,))
+            self._conn.executemany(
+                'INSERT INTO entities (doc, kind, value, text) VALUES (?, ?, ?, ?)',
+                [(doc.id, entity['kind'], entity.get('value'), entity.get('text'))
+                 for entity in entities])
+
+    def documents_with(self, kind, value):
+        """
+        ids of every Document with an entity of kind and value
+        """
+        with self._lock:
+            return [row['doc'] for row in self._conn.execute(
+                'SELECT DISTINCT doc FROM entities WHERE kind = ? AND value = ?',
+                (kind, value))]
+
+    ###########################################################################
+    # Thumbnail Atlas Slots
+    ###########################################################################
+
+    def thumbnails(self):
+        with self._lock:
+            return self._conn.execute('SELECT * FROM thumbnails').fetchall()
+
+    def set_thumbnail(self, id, slot, width, height):
+        self.execute('INSERT OR REPLACE INTO thumbnails (doc, slot, width, height) VALUES (?, ?, ?, ?)',
+                     (id, slot, width, height))
+
+    def remove_thumbnail(self, id):
+        self.execute('DELETE FROM thumbnails WHERE doc = ?', (id,))
+
+    def clear_thumbnails(self):
+        self.execute('DELETE FROM thumbnails')
+
+    ###########################################################################
+    # Full Text Search
+    #
+    #   terms:    every distinct lowercased word
+    #   postings: term -> (doc, page, word) for every occurrence
+    #   grams:    trigram -> term, to find terms close to a misspelling
+    ###########################################################################
+
+    @staticmethod
+    def grams(term):
+        padded = f'${term}$'
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def term_id(self, term):
+        cursor = self._conn.execute('INSERT OR IGNORE INTO terms (term, length) VALUES (?, ?)',
+                                    (term, len(term)))
+        if cursor.rowcount:
+            id = cursor.lastrowid
+            self._conn.executemany('INSERT INTO grams (gram, term) VALUES (?, ?)',
+                                   [(gram, id) for gram in self.grams(term)])
+            return id
+        return self._conn.execute('SELECT id FROM terms WHERE term = ?', (term,)).fetchone()[0]
+
+    def update_postings(self, doc):
+        """
+        Replace doc's postings with the words in its Layout
+        """
+        wx.LogDebug(f'Index.update_postings({doc.id})')
+        tokens = [(page, word, text.lower()) for page, word, text in doc.layout.tokens() if text]
+        with self.transaction():
+            self._conn.execute('DELETE FROM postings WHERE doc = ?', (doc.id,))
+            ids = {}
+            postings = []
+            for page, word, term in tokens:
+                if term not in ids:
+                    ids[term] = self.term_id(term)
+                postings.append((ids[term], doc.id, page, word))
+            self._conn.executemany('INSERT INTO postings (term, doc, page, word) VALUES (?, ?, ?, ?)',
+                                   postings)
+
+    def clear_postings(self):
+        with self.transaction():
+            self.execute('DELETE FROM postings')
+            self.execute('DELETE FROM grams')
+            self.execute('DELETE FROM terms')
+
+    def fuzzy_terms(self, term):
+        """
+        ids of the terms that look like term
+        """
+        grams = self.grams(term)
+        # fuzz.ratio can't exceed 200 * shorter / (sum of lengths)
+        shortest = -(-self.FUZZY_RATIO * len(term) // (200 - self.FUZZY_RATIO))
+        longest = (200 - self.FUZZY_RATIO) * len(term) // self.FUZZY_RATIO
+        rows = self._conn.execute(f"""
+            SELECT terms.id, terms.term FROM grams
+            JOIN terms ON terms.id = grams.term
+            WHERE gram IN ({', '.join(['?'] * len(grams))})
+              AND terms.length BETWEEN ? AND ?
+            GROUP BY terms.id
+            HAVING COUNT(*) >= ?
+        """, (*grams, shortest, longest, max(1, len(grams) // 2)))
+        scored = [(fuzz.ratio(term, candidate), id) for id, candidate in rows]
+        return [id for score, id in sorted(scored, reverse=True)[:self.FUZZY_TERMS]
+                if score >= self.FUZZY_RATIO]
+
+    def match_terms(self, token):
+        """
+        SQL and parameters selecting the term ids a query token matches
+
+            word    exactly
+            word*   as a prefix
+            word~   fuzzily
+        """
+        prefix, fuzzy = token.endswith('*'), token.endswith('~')
+        term = token.lower().strip(string.punctuation)
+        if not term:
+            return None
+        if prefix:
+            return 'SELECT id FROM terms WHERE term >= ? AND term < ?', (term, term + '\uffff')
+        if fuzzy:
+            ids = self.fuzzy_terms(term)
+            return f'VALUES {", ".join(["(?)"] * len(ids))}' if ids else None, tuple(ids)
+        return 'SELECT id FROM terms WHERE term = ?', (term,)
+
+    def search(self, query, limit=50):
+        """
+        Documents containing every word of query, most hits first
+
+        Returns [(doc id, [(page, word), ...])]
+        """
+        wx.LogDebug(f'Index.search({query!r})')
+        with self._lock:
+            clauses = [self.match_terms(token) for token in query.split()]
+            clauses = [clause for clause in clauses if clause]
+            if not clauses or not all(sql for sql, params in clauses):
+                return []
+            hits = None
+            for sql, params in clauses:
+                counts = dict(self._conn.execute(f"""
+                    SELECT doc, COUNT(*) FROM postings
+                    WHERE term IN ({sql})
+                    GROUP BY doc
+                """, params).fetchall())
+                if hits is None:
+                    hits = counts
+                else:
+                    hits = {doc: hits[doc] + count for doc, count in counts.items() if doc in hits}
+                if not hits:
+                    return []
+            terms = ' UNION ALL '.join(sql for sql, params in clauses)
+            params = tuple(param for sql, params in clauses for param in params)
+            results = []
+            for doc in sorted(hits, key=hits.get, reverse=True)[:limit]:
+                results.append((doc, [tuple(row) for row in self._conn.execute(f"""
+                    SELECT page, word FROM postings
+                    WHERE doc = ? AND term IN ({terms})
+                    ORDER BY word
+                """, (doc, *params))]))
+            return results
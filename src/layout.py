@@ -0,0 +1,276 @@
+import string
+import numpy as np
+
+from .placeable import Placeable
+
+PAGE = 1
+BLOCK = 2
+PARAGRAPH = 3
+LINE = 4
+WORD = 5
+
+
+class Layout():
+    """
+    Columnar store of Tesseract's page/block/paragraph/line/word hierarchy
+
+    Every node is a row in a set of parallel NumPy arrays.  All the text
+    lives in one string with per-node offsets, both raw and with punctuation
+    stripped.  Page, Block, Paragraph, Line and Word are __slots__ views of
+    (layout, index), created on access and cheap to throw away.
+    """
+
+    # What save() writes; everything else is derived on load
+    COLUMNS = ('level', 'left', 'top', 'width', 'height', 'conf',
+               'raw_end', 'text_start', 'text_end')
+
+    def __init__(self, document, data):
+        self.document = document
+
+        levels = np.asarray(data.get('level', []), dtype=np.int8)
+        texts = [str(text) for text in data.get('text', [])]
+        # Tesseract reports empty words for things it thinks are text but
+        # can't read.  Leave them out.
+        keep = np.fromiter((level != WORD or (text and not text.isspace())
+                            for level, text in zip(levels, texts)),
+                           dtype=bool, count=len(texts))
+        rows = np.flatnonzero(keep)
+        texts = [texts[row] for row in rows]
+
+        self.level = levels[rows]
+        for column in ('left', 'top', 'width', 'height'):
+            setattr(self, column, np.asarray(data.get(column, []), dtype=np.int32)[rows])
+        self.conf = np.asarray([float(conf) for conf in data.get('conf', [])], dtype=np.float32)[rows]
+        self.parent = self._parents(self.level)
+
+        # One string for all the text; raw and stripped slices into it
+        lengths = np.fromiter(map(len, texts), dtype=np.int32, count=len(texts))
+        self.raw_end = np.cumsum(lengths, dtype=np.int32)
+        self.raw_start = self.raw_end - lengths
+        self.text_start = self.raw_start + np.fromiter(
+            (len(text) - len(text.lstrip(string.punctuation)) for text in texts),
+            dtype=np.int32, count=len(texts))
+        self.text_end = np.maximum(self.text_start, self.raw_end - np.fromiter(
+            (len(text) - len(text.rstrip(string.punctuation)) for text in texts),
+            dtype=np.int32, count=len(texts)))
+        self.blob = ''.join(texts)
+
+        self._index()
+
+    ###########################################################################
+    # Sidecar File
+    ###########################################################################
+
+    @classmethod
+    def load(cls, document, path):
+        """
+        Layout from a sidecar written by save(), without re-parsing
+        Tesseract's output
+        """
+        layout = cls.__new__(cls)
+        layout.document = document
+        with np.load(path) as sidecar:
+            for column in cls.COLUMNS:
+                setattr(layout, column, sidecar[column])
+            layout.blob = sidecar['blob'].tobytes().decode('utf-8')
+        layout.raw_start = np.append(np.int32(0), layout.raw_end[:-1]).astype(np.int32)
+        layout.parent = cls._parents(layout.level)
+        layout._index()
+        return layout
+
+    def save(self, path):
+        """
+        Write the columns and text out as an uncompressed .npz
+        """
+        with open(path, 'wb') as file:
+            np.savez(file,
+                     blob=np.frombuffer(self.blob.encode('utf-8'), dtype=np.uint8),
+                     **{column: getattr(self, column) for column in self.COLUMNS})
+
+    ###########################################################################
+    # Structure
+    ###########################################################################
+
+    def _index(self):
+        """
+        Derive the navigation arrays from level and parent
+        """
+        # Children of each node, contiguous and in order:
+        #     order[child_ptr[i + 1]:child_ptr[i + 2]]
+        # with the pages (parent -1) first
+        self.order = np.argsort(self.parent, kind='stable')
+        self.child_ptr = np.searchsorted(self.parent[self.order], np.arange(-1, len(self.level) + 1))
+
+        # Each node's position among its siblings, for O(1) prev/next
+        self.position = np.empty(len(self.level), dtype=np.int32)
+        self.position[self.order] = np.arange(len(self.level)) - self.child_ptr[self.parent[self.order] + 1]
+
+        # Document order is pre-order, so each subtree is a contiguous run
+        # of indices: [i, end[i])
+        self.end = self._ends(self.level)
+        self._levels = {}
+
+        # Sparse, mutable per-node attributes: {name: {index: value}}
+        self.attrs = {}
+
+    @staticmethod
+    def _parents(levels):
+        # Nodes arrive in document order, so a node's parent is the closest
+        # preceding node one level up
+        parents = np.full(len(levels), -1, dtype=np.int32)
+        indices = np.arange(len(levels))
+        for level in (BLOCK, PARAGRAPH, LINE, WORD):
+            candidates = indices[levels == level - 1]
+            nodes = indices[levels == level]
+            if len(candidates):
+                found = np.searchsorted(candidates, nodes) - 1
+                parents[nodes] = np.where(found >= 0, candidates[np.maximum(found, 0)], -1)
+        return parents
+
+    @staticmethod
+    def _ends(levels):
+        ends = np.full(len(levels), len(levels), dtype=np.int32)
+        indices = np.arange(len(levels))
+        for level in (PAGE, BLOCK, PARAGRAPH, LINE, WORD):
+            nodes = indices[levels == level]
+            closers = indices[levels <= level]
+            found = np.searchsorted(closers, nodes, side='right')
+            ends[nodes] = np.append(closers, len(levels))[found]
+        return ends
+
+    ###########################################################################
+    # Navigation
+    ###########################################################################
+
+    def children(self, index):
+        return self.order[self.child_ptr[index + 1]:self.child_ptr[index + 2]]
+
+    def sibling(self, index, offset):
+        first = self.child_ptr[self.parent[index] + 1]
+        position = first + self.position[index] + offset
+        if first <= position < self.child_ptr[self.parent[index] + 2]:
+            return self.view(self.order[position])
+
+    def at_level(self, level):
+        """
+        Indices of every node at level, in document order
+        """
+        if level not in self._levels:
+            self._levels[level] = np.flatnonzero(self.level == level)
+        return self._levels[level]
+
+    def descendants(self, index, level):
+        nodes = self.at_level(level)
+        return nodes[np.searchsorted(nodes, index, side='right'):
+                     np.searchsorted(nodes, self.end[index], side='left')]
+
+    def view(self, index):
+        return Node.VIEWS[self.level[index]](self, int(index))
+
+    def views(self, indices):
+        return [self.view(index) for index in indices]
+
+    @property
+    def pages(self):
+        return self.views(self.children(-1))
+
+    ###########################################################################
+    # Text
+    ###########################################################################
+
+    def raw(self, index):
+        return self.blob[self.raw_start[index]:self.raw_end[index]]
+
+    def text(self, index):
+        return self.blob[self.text_start[index]:self.text_end[index]]
+
+    def tokens(self):
+        """
+        Yields (page number, index, text) for every word, in document order
+        """
+        words = self.at_level(WORD)
+        pages = np.searchsorted(self.at_level(PAGE), words, side='right')
+        for page, index in zip(pages.tolist(), words.tolist()):
+            yield page, index, self.text(index)
+
+    ###########################################################################
+    # Attributes
+    ###########################################################################
+
+    def get(self, index, name, default=None):
+        return self.attrs.get(name, {}).get(index, default)
+
+    def set(self, index, name, value):
+        self.attrs.setdefault(name, {})[index] = value
+
+
+class Node(Placeable):
+    """
+    A lightweight view of one row of a Layout
+    """
+
+    __slots__ = ('layout', 'index')
+    VIEWS = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if hasattr(cls, 'LEVEL'):
+            Node.VIEWS[cls.LEVEL] = cls
+
+    def __init__(self, layout, index):
+        self.layout = layout
+        self.index = index
+
+    def __eq__(self, other):
+        return (type(other) is type(self)
+                and other.layout is self.layout
+                and other.index == self.index)
+
+    def __hash__(self):
+        return hash((id(self.layout), self.index))
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.index})'
+
+    ###########################################################################
+    # Properties
+    ###########################################################################
+
+    @property
+    def left(self):
+        return int(self.layout.left[self.index])
+
+    @property
+    def top(self):
+        return int(self.layout.top[self.index])
+
+    @property
+    def width(self):
+        return int(self.layout.width[self.index])
+
+    @property
+    def height(self):
+        return int(self.layout.height[self.index])
+
+    @property
+    def confidence(self):
+        return float(self.layout.conf[self.index])
+
+    @property
+    def parent(self):
+        return self.layout.view(self.layout.parent[self.index])
+
+    @property
+    def children(self):
+        return self.layout.views(self.layout.children(self.index))
+
+    @property
+    def prev(self):
+        return self.layout.sibling(self.index, -1)
+
+    @property
+    def next(self):
+        return self.layout.sibling(self.index, 1)
+
+    def descendants(self, level):
+        return self.layout.views(self.layout.descendants(self.index, level))
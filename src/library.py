@@ -3,120 +3,312 @@ import os
 import PIL
 import glob
 import uuid
+import hashlib
 import filetype
+import threading
+
+from collections import OrderedDict
 
 from .document import Document
+from .atlas import Atlas
+from .engine import Engine
+from .handle import DocumentHandle
+from .index import Index
+from .matcher import FuzzyIndex
 from .vehicle import Vehicle
 
 class Library():
-    def __init__(self, dir):
+    def __init__(self, dir, workers=None, cache_size=64):
         wx.LogDebug(f'Initializing Library at {dir}')
         self.dir = dir
+        self.index = Index(dir)
+        self.atlas = Atlas(dir, self.index)
+        self.engine = Engine(workers)
+        self.cache_size = cache_size
+        self._lock = threading.RLock()
+        self._importing = set()
+        self._cache = OrderedDict()
+        self._vehicles = None
+        self._vehicle_index = None
 
+        # DocumentHandles, not Documents.  See materialize().
         self.documents = []
-        for json_path in glob.glob(f'{dir}/*/*/*/props.json'):
-            doc = Document.from_json(json_path)
-            if doc.md5 in self.md5s:
-                dialog = wx.MessageDialog(None,
-                                          f'{doc.md5}',
-                                          'Merge duplicate entries?',
-                                          wx.YES_NO)
-                result = dialog.ShowModal()
-                if result == wx.ID_YES:
-                    self.doc_from_md5(doc.md5).merge(doc)
-                    doc.delete()
-                wx.LogDebug(f"Skipping {doc.json_path}")
+        self._by_id = {}
+        self._by_md5 = {}
+        if self.index.created:
+            self.rescan()
+        else:
+            for row in self.index.rows():
+                self.add_handle(DocumentHandle.from_row(self, row))
+
+    ###########################################################################
+    # Vehicles
+    ###########################################################################
+
+    @property
+    def vehicles(self):
+        """
+        Every Vehicle under vehicles/, read on first use
+        """
+        with self._lock:
+            if self._vehicles is None:
+                self._vehicles = []
+                for entry in os.scandir(os.path.join(self.dir, 'vehicles')):
+                    if os.path.exists(os.path.join(entry.path, 'props.json')):
+                        if os.path.exists(os.path.join(entry.path, 'image.png')):
+                            self._vehicles.append(Vehicle(entry.path))
+            return self._vehicles
+
+    @property
+    def vehicle_index(self):
+        with self._lock:
+            if self._vehicle_index is None:
+                self._vehicle_index = self.index_vehicles(self.vehicles)
+            return self._vehicle_index
+
+    @staticmethod
+    def index_vehicles(vehicles):
+        """
+        FuzzyIndex of every VIN and plate number, VINs first
+        """
+        return FuzzyIndex([(vehicle.vin, vehicle) for vehicle in vehicles]
+                          + [(plate.number, vehicle)
+                             for vehicle in vehicles
+                             for plate in getattr(vehicle, 'plates', [])])
+
+    def rescan(self):
+        """
+        Rebuild the Index from every props.json in the Library
+        """
+        wx.LogDebug(f'Rescanning {self.dir}')
+        self.documents = []
+        self._by_id = {}
+        self._by_md5 = {}
+        self.evict()
+        with self.index.transaction():
+            self.index.clear()
+            # Documents live at YYYY/MM/DD/<id>/props.json
+            for json_path in glob.glob(f'{self.dir}/*/*/*/*/props.json'):
+                self.add_json(json_path)
+
+    def add_json(self, json_path):
+        doc = Document.from_json(self, json_path)
+        if doc.md5 and doc.md5 in self.md5s:
+            dialog = wx.MessageDialog(None,
+                                      f'{doc.md5}',
+                                      'Merge duplicate entries?',
+                                      wx.YES_NO)
+            result = dialog.ShowModal()
+            if result == wx.ID_YES:
+                self.doc_from_md5(doc.md5).merge(doc)
+                doc.delete_files()
+            wx.LogDebug(f"Skipping {doc.json_path}")
+        else:
+            self.add_document(doc)
+            self.index.update(doc)
+
+    def add_document(self, doc):
+        with self._lock:
+            if doc.id in self._by_id:
+                self.refresh(doc)
             else:
-                self.documents.append(doc)
+                self.add_handle(DocumentHandle.from_document(self, doc))
+            return self._by_id[doc.id]
 
-        self.vehicles = []
-        for entry in os.scandir(os.path.join(self.dir, 'vehicles')):
-            if os.path.exists(os.path.join(entry.path, 'props.json')):
-                if os.path.exists(os.path.join(entry.path, 'image.png')):
-                    self.vehicles.append(Vehicle(entry.path))
+    def add_handle(self, handle):
+        with self._lock:
+            self.documents.append(handle)
+            self._by_id[handle.id] = handle
+            if handle.md5:
+                self._by_md5[handle.md5] = handle
+
+    def refresh(self, doc):
+        """
+        Bring doc's handle up to date after its JSON has changed
+        """
+        with self._lock:
+            if handle := self._by_id.get(doc.id):
+                if handle.md5 != doc.md5:
+                    self._by_md5.pop(handle.md5, None)
+                    if doc.md5:
+                        self._by_md5[doc.md5] = handle
+                handle.update(doc)
 
     def doc_from_md5(self, md5):
-        docs = [doc for doc in self.documents if doc.md5 == md5]
-        assert len(docs) == 1
-        return docs[0]
+        return self._by_md5[md5]
 
     def new_id(self):
         id = uuid.uuid4().hex
-        while id in self.ids:
+        while id in self._by_id:
             wx.LogDebug("You should buy a lottery ticket.")
             id = uuid.uuid4().hex
         return id
 
+    ###########################################################################
+    # Document Cache
+    ###########################################################################
+
+    def materialize(self, handle):
+        """
+        The full Document behind handle
+
+        The most recently used cache_size Documents are kept loaded.
+        """
+        with self._lock:
+            doc = self._cache.pop(handle.id, None)
+            if doc is None:
+                wx.LogDebug(f'Library.materialize({handle.id})')
+                doc = Document.from_handle(self, handle)
+            self._cache[handle.id] = doc
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return doc
+
+    def evict(self, id=None):
+        """
+        Drop one loaded Document, or all of them
+        """
+        with self._lock:
+            if id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(id, None)
+
+    ###########################################################################
+    # Thumbnails
+    ###########################################################################
+
+    def thumbnail(self, doc):
+        """
+        (width, height, RGB bytes) of doc's thumbnail from the Atlas, or None
+
+        Documents missing from the Atlas are added from their thumbnail.webp.
+        """
+        if doc.id not in self.atlas:
+            self.atlas.add_file(doc.id, doc.thumb_path)
+        return self.atlas.view(doc.id)
+
+    def rebuild_atlas(self, progress=None):
+        self.atlas.rebuild(list(self.documents), progress)
+
+    ###########################################################################
+    # Search
+    ###########################################################################
+
+    def search(self, query, limit=50):
+        """
+        Returns [(DocumentHandle, [(page, word), ...])], best match first
+        """
+        return [(self._by_id[id], hits)
+                for id, hits in self.index.search(query, limit)
+                if id in self._by_id]
+
+    def rebuild_search(self, progress=None):
+        """
+        Rebuild the full text index from every Document's OCR data
+        """
+        progress = progress or (lambda text: None)
+        self.index.clear_postings()
+        # One transaction per Document, so imports and searches aren't
+        # locked out for the whole rebuild
+        documents = list(self.documents)
+        for n, doc in enumerate(documents, start=1):
+            progress(f'{n} of {len(documents)}')
+            if doc.has_ocr:
+                self.index.update_postings(doc.document)
+
     @property
     def md5s(self):
-        return [doc.md5 for doc in self.documents]
+        return self._by_md5.keys()
 
     @property
     def ids(self):
-        return [doc.id for doc in self.documents]
+        return self._by_id.keys()
+
+    ###########################################################################
+    # Content Hashing
+    ###########################################################################
+
+    @staticmethod
+    def hash_file(filepath, chunk_size=1 << 20):
+        md5 = hashlib.md5()
+        with open(filepath, 'rb') as file:
+            while chunk := file.read(chunk_size):
+                md5.update(chunk)
+        return md5.hexdigest()
+
+    @staticmethod
+    def hash_images(pil_images):
+        md5 = hashlib.md5()
+        for pil_image in pil_images:
+            md5.update(f'{pil_image.mode}{pil_image.size}'.encode())
+            md5.update(pil_image.tobytes())
+        return md5.hexdigest()
 
-    def import_file(self, filepath):
+    def claim(self, md5):
+        """
+        Reserve md5 for an import that's about to start
+
+        Returns False if it's already in the Library or being imported
+        """
+        with self._lock:
+            if md5 in self._by_md5:
+                wx.LogDebug(f'Not importing duplicate of {self._by_md5[md5].json_path}')
+                return False
+            if md5 in self._importing:
+                wx.LogDebug(f'Not importing duplicate of an import in progress: {md5}')
+                return False
+            self._importing.add(md5)
+            return True
+
+    ###########################################################################
+    # Importers: Return the new Document, or False if it's a duplicate
+    #
+    #            These block for the whole processing pipeline.  The UI
+    #            should run them through an Importer.
+    ###########################################################################
+
+    def import_file(self, filepath, progress=None):
         kind = filetype.guess(filepath)
         if not kind:
-            wx.MessageBox("Unknown filetype.  Maybe plaintext?")
-        elif kind.mime.endswith('/pdf'):
-            return self.import_pdf(filepath)
-        elif kind.mime.startswith('image/'):
-            return self.import_image(PIL.Image.open(filepath))
+            wx.CallAfter(wx.MessageBox, "Unknown filetype.  Maybe plaintext?")
+            return
+        if not (kind.mime.endswith('/pdf') or kind.mime.startswith('image/')):
+            wx.CallAfter(wx.MessageBox, f'{kind.mime} import not supported')
+            return
+        if kind.mime.endswith('/pdf'):
+            return self.import_pdf(filepath, progress=progress)
         else:
-            wx.MessageBox(f'{kind.mime} import not supported')
+            return self.import_image(PIL.Image.open(filepath),
+                                     self.hash_file(filepath),
+                                     progress=progress)
 
-    def import_image(self, pil_image):
+    def import_image(self, pil_image, md5=None, progress=None):
         wx.LogDebug('Importing Image')
-        doc = Document(self, [pil_image])
-        doc.write_files(self.dir)
-        # TODO: Return whether image was successfully imported or not
-        return True
+        return self.import_images([pil_image], md5, progress=progress)
 
-    def import_images(self, pil_images):
+    def import_images(self, pil_images, md5=None, progress=None, results=None):
+        """
+        results, if given, are Engine.submit() Futures for pil_images, in
+        the same order
+        """
         wx.LogDebug('Library.import_images()')
-        doc = Document(self, pil_images)
-        doc.write_files(self.dir)
+        return self._import(pil_images, md5 or self.hash_images(pil_images), progress, results)
 
-    def import_pdf(self, src):
+    def import_pdf(self, src, md5=None, progress=None):
         wx.LogDebug('Importing PDF to Library')
-        doc = Document(self, src)
-        doc.write_files(self.dir)
-        # date = datetime.now()
-        # with open(src, 'rb') as file:
-        #     src_md5 = hashlib.md5(file.read()).hexdigest()
-        # for doc in self.documents:
-        #     wx.LogDebug(f'Looking at {doc.json_path}')
-        #     if doc.md5 == src_md5:
-        #         wx.LogDebug('Not importing duplicate')
-        #         return False
-        # ext = os.path.splitext(src)[1]
-        # dir = os.path.join(self.dir,
-        #                    date.strftime('%Y'),
-        #                    date.strftime('%m'),
-        #                    date.strftime('%d'))
-        # wx.LogDebug(f"Creating {dir} if it doesn't already exist.")
-        # os.makedirs(dir, exist_ok=True)
-        # uid = uuid.uuid4().hex
-        # while glob.glob(os.path.join(dir, uid)):
-        #     wx.LogDebug("You should buy a lottery ticket.")
-        #     uid = uuid.uuid4()
-        # wx.LogDebug(f'Document UUID is {uuid}')
-        # path = os.path.join(dir, uid+ext)
-        # wx.LogDebug(f'Document path is {path}')
-        # shutil.copy2(src, path)
-        # with open(path, 'rb') as file:
-        #     dst_md5 = hashlib.md5(file.read()).hexdigest()
-        # assert src_md5 == dst_md5
-        # json_filepath = os.path.join(dir, uid+'.json')
-        # json_dict = {
-        #     'import': {
-        #         'timestamp': datetime.now(),
-        #         'source': src
-        #     },
-        #     'md5': dst_md5
-        # }
-        # with open(json_filepath, 'w') as file:
-        #     json.dump(json_dict, file, indent=3, default=str)
-        # self.documents.append(Document.from_json(json_filepath))
-        # return self.documents[-1]
+        return self._import(src, md5 or self.hash_file(src), progress)
+
+    def _import(self, pages, md5, progress=None, results=None):
+        if not self.claim(md5):
+            for future in results or []:
+                future.cancel()
+            return False
+        try:
+            doc = Document(self, pages, md5=md5, progress=progress, results=results)
+            doc.write_files(self.dir)
+            self.add_document(doc)
+        finally:
+            with self._lock:
+                self._importing.discard(md5)
+        return doc
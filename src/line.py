@@ -1,33 +1,26 @@
-from .placeable import Placeable
+from .layout import Node, LINE
 
 
-class Line(Placeable):
-    def __init__(self, paragraph, left, top, width, height, confidence, text):
-        super().__init__(left, top, width, height)
-        if text:
-            raise Exception(f'Line should never be passed text directly: {text}')
-        self.paragraph = paragraph
-        self.words = []
-        self.breaks = []
+class Line(Node):
+    __slots__ = ()
+    LEVEL = LINE
 
     ###########################################################################
     # Properties
     ###########################################################################
 
     @property
-    def text(self):
-        return ' '.join([word.text for word in self.words])
+    def paragraph(self):
+        return self.parent
 
     @property
-    def prev(self):
-        index = self.paragraph.lines.index(self)
-        if index:
-            return self.paragraph.lines[index-1]
+    def words(self):
+        return self.children
 
-    ###########################################################################
-    # Public Methods
-    ###########################################################################
+    @property
+    def breaks(self):
+        return [edge for word in self.words for edge in (word.left, word.right)]
 
-    def append(self, word):
-        self.words.append(word)
-        self.breaks.extend([word.left, word.right])
+    @property
+    def text(self):
+        return ' '.join([word.text for word in self.words])
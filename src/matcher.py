@@ -0,0 +1,102 @@
+import wx
+import math
+
+from collections import defaultdict
+from thefuzz import fuzz, process
+
+
+class FuzzyIndex():
+    """
+    Finds which of a fixed set of keys a piece of text looks like
+
+    Keys are blocked by length and by character bigram, so a word is only
+    scored against the few keys it could plausibly match, and those are
+    scored in one batch.  Built once; rebuild it if the keys change.
+    """
+
+    def __init__(self, items, min_ratio=75):
+        """
+        items is an iterable of (key, value)
+        """
+        self.min_ratio = min_ratio
+        self.short = self.shortest_blocked(min_ratio)
+        self.keys = []
+        self.values = []
+        self._by_length = defaultdict(set)
+        self._by_gram = defaultdict(set)
+        for key, value in items:
+            if not key:
+                continue
+            id = len(self.keys)
+            self.keys.append(key)
+            self.values.append(value)
+            self._by_length[len(key)].add(id)
+            for gram in self.grams(key):
+                self._by_gram[gram].add(id)
+        wx.LogDebug(f'FuzzyIndex: {len(self.keys)} keys')
+
+    def __len__(self):
+        return len(self.keys)
+
+    @staticmethod
+    def grams(text):
+        return {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+
+    @staticmethod
+    def shortest_blocked(min_ratio):
+        """
+        Texts shorter than this can match a key they share no bigram with
+
+        Without a shared bigram, each pair of neighbouring matched
+        characters needs a gap between them in one string or the other.
+        So m matches cost at least 3m - 1 characters between the two
+        strings, and score at most 200m / (3m - 1).
+        """
+        ratio = (min_ratio - 0.5) / 100  # fuzz.ratio rounds
+        if ratio <= 2 / 3:
+            return math.inf
+        matches = math.floor(ratio / (3 * ratio - 2))
+        return math.floor(2 * matches / ratio)
+
+    def lengths(self, length):
+        """
+        Key lengths that can score min_ratio against text of this length
+
+        fuzz.ratio can't exceed 200 * shorter / (sum of lengths)
+        """
+        return [n for n in self._by_length
+                if 200 * min(n, length) >= self.min_ratio * (n + length)]
+
+    def candidates(self, text):
+        by_length = set()
+        for n in self.lengths(len(text)):
+            by_length |= self._by_length[n]
+        if not by_length or len(text) < self.short:
+            # Short texts can match a key without sharing a bigram with it
+            return by_length
+        by_gram = set()
+        for gram in self.grams(text):
+            by_gram.update(self._by_gram.get(gram, ()))
+        return by_length & by_gram
+
+    def match(self, text):
+        """
+        Returns [(key, value, score)] for every key text looks like, in the
+        order the keys were added
+        """
+        if not text:
+            return []
+        choices = {id: self.keys[id] for id in self.candidates(text)}
+        if not choices:
+            return []
+        # fuzz.ratio rounds; the batch scorer may hand back the unrounded
+        # score, so round it the same way before comparing
+        results = process.extractBests(text, choices,
+                                       scorer=fuzz.ratio,
+                                       processor=None,
+                                       score_cutoff=self.min_ratio - 1,
+                                       limit=None)
+        results = [(key, int(round(score)), id) for key, score, id in results]
+        return [(key, self.values[id], score)
+                for key, score, id in sorted(results, key=lambda result: result[2])
+                if score >= self.min_ratio]
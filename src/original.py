@@ -5,55 +5,82 @@ import filetype
 import pdf2image
 
 from PIL import ImageSequence
-from PIL import Image as PILImage
 
 from .image import Image
 
 
 class Original():
+    """
+    The pages of a Document as they were handed to us
+
+    Pages are rasterized or decoded one small window at a time as they're
+    iterated over, so memory use doesn't grow with page count.
+    """
+
+    CHUNK = 4  # PDF pages per pdftoppm run
+
     def __init__(self, pages):
         self.original_path = None
+        self._pil_images = None
         if isinstance(pages, str):
             if os.path.isfile(pages):
                 self.original_path = pages
                 kind = filetype.guess(pages)
                 if not kind:
                     raise ValueError("Unknown filetype.")
-                elif kind.mime.endswith('/pdf'):
-                    self.pages = [Image(page) for page in pdf2image.convert_from_path(pages)]
-        elif isinstance(pages[0], Image):
-            self.pages = pages
+                elif not kind.mime.endswith('/pdf'):
+                    raise ValueError(f"Don't know how to rasterize {kind.mime}")
+            else:
+                raise ValueError(f"{pages} is not a file")
+        else:
+            self._pil_images = [page.pil_image if isinstance(page, Image) else page
+                                for page in pages]
+
+    ###########################################################################
+    # Properties
+    ###########################################################################
+
+    @property
+    def pages(self):
+        """
+        Lazily yields each page as an Image
+        """
+        if self.original_path:
+            n_pages = pdf2image.pdfinfo_from_path(self.original_path)['Pages']
+            for first in range(1, n_pages + 1, self.CHUNK):
+                last = min(first + self.CHUNK - 1, n_pages)
+                wx.LogDebug(f'Original.pages: Rasterizing pages {first}-{last} of {n_pages}')
+                for page in pdf2image.convert_from_path(self.original_path,
+                                                        first_page=first,
+                                                        last_page=last):
+                    yield Image(page)
+        elif len(self._pil_images) == 1 and getattr(self._pil_images[0], 'is_animated', False):
+            for frame in ImageSequence.Iterator(self._pil_images[0]):
+                yield Image(frame.convert('RGBA'))
         else:
-            if len(pages) == 1 and getattr(pages[0], 'is_animated', False):
-                pil_images = []
-                for frame in ImageSequence.Iterator(pages[0]):
-                    image = PILImage.new("RGBA", frame.size)
-                    image.paste(frame)
-                    pil_images.append(image)
-                pages = pil_images
-            self.pages = [Image(page) for page in pages]
+            for page in self._pil_images:
+                yield Image(page)
 
     @property
     def ext(self):
-        if isinstance(self.pages[0], Image):
-            return '.tiff'
+        if self.original_path:
+            return os.path.splitext(self.original_path)[1].lower()
         else:
-            raise ValueError(f"Don't know extension for {self.pages[0]}")
+            return '.tiff'
+
+    ###########################################################################
+    # File I/O
+    ###########################################################################
 
     def save(self, filepath):
         wx.LogDebug(f'Original.save({filepath})')
         if self.original_path:
-            ext = os.path.splitext(self.original_path)[1]
-            dir = os.path.dirname(filepath)
-            dest = os.path.join(dir, 'original.' + ext)
-            shutil.move(self.original_path, dest)
-        if isinstance(self.pages[0], Image):
-            wx.LogDebug(f'Original.save(): Saving {self.pages}')
-            self.pages[0].save(filepath,
-                               compression='lzma',
-                               lossless=True,
-                               save_all=True,
-                               append_images=self.pages[1:])
+            shutil.copy2(self.original_path, filepath)
         else:
-            raise ValueError(f"Don't know how to save {self.pages}")
+            wx.LogDebug(f'Original.save(): Saving {self._pil_images}')
+            self._pil_images[0].save(filepath,
+                                     compression='lzma',
+                                     lossless=True,
+                                     save_all=True,
+                                     append_images=self._pil_images[1:])
         wx.LogDebug('Original.save(END)')
@@ -1,26 +1,30 @@
-from .placeable import Placeable
+from .layout import Node, PAGE, PARAGRAPH, LINE, WORD
 
 
-class Page(Placeable):
-    def __init__(self, document, left, top, width, height, confidence, text):
-        super().__init__(left, top, width, height)
-        if text:
-            raise Exception(f'Page should never be passed text directly: {text}')
-        self.document = document
-        self.blocks = []
+class Page(Node):
+    __slots__ = ()
+    LEVEL = PAGE
 
     ###########################################################################
     # Properties
     ###########################################################################
 
+    @property
+    def document(self):
+        return self.layout.document
+
+    @property
+    def blocks(self):
+        return self.children
+
     @property
     def paragraphs(self):
-        return [paragraph for block in self.blocks for paragraph in block.paragraphs]
+        return self.descendants(PARAGRAPH)
 
     @property
     def lines(self):
-        return [line for paragraph in self.paragraphs for line in paragraph.lines]
+        return self.descendants(LINE)
 
     @property
     def words(self):
-        return [word for line in self.lines for word in line.words]
+        return self.descendants(WORD)
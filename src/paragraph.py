@@ -1,22 +1,26 @@
-from .placeable import Placeable
+from .layout import Node, PARAGRAPH, WORD
 
 
-class Paragraph(Placeable):
-    def __init__(self, block, left, top, width, height, confidence, text):
-        super().__init__(left, top, width, height)
-        if text:
-            raise Exception(f'Paragraph should never be passed text directly: {text}')
-        self.block = block
-        self.lines = []
+class Paragraph(Node):
+    __slots__ = ()
+    LEVEL = PARAGRAPH
 
     ###########################################################################
     # Properties
     ###########################################################################
 
+    @property
+    def block(self):
+        return self.parent
+
+    @property
+    def lines(self):
+        return self.children
+
     @property
     def text(self):
         return ' '.join([line.text for line in self.lines])
 
     @property
     def words(self):
-        return [word for line in self.lines for word in line.words]
+        return self.descendants(WORD)
@@ -1,4 +1,6 @@
 class Placeable:
+    __slots__ = ()
+
     def __init__(self, left, top, width, height):
         # wx.LogDebug(f'{type(self)}.__init__{left, top, width, height}')
         self.left = left
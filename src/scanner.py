@@ -1,28 +1,51 @@
 import wx
 import sane
+import json
 import threading
 
+from functools import partial
+
 from .confmenu import ConfMenu
+from .importer import Importer
+from .session import Session
 
 
 class Scanner():
     """
     A simple Scanner object
+
+    The menus come up straight away from what was found last time, while
+    the devices are rediscovered in the background.
     """
 
+    # Option constraints worth remembering between runs
+    CACHED_OPTIONS = ('source', 'mode', 'resolution', 'br_x', 'br_y')
+
     def __init__(self, frame):
         self.frame = frame
-        self.options = {}
+        self.session = Session(frame, frame.config.ReadInt('/Scan/IdleTimeout', 120))
         self.deviceMenu = ConfMenu(self.frame, "/Scan")
         self.modeMenu = ConfMenu(self.frame, "/Scan")
+        self.devices, self.options = self.LoadCache()
+        self.PopulateMenus()
+        # The Scan menu doesn't exist until the frame's finished building
+        wx.CallAfter(self.frame.EnableScanUI, bool(self.devices))
         self.PushStatusText("Initializing scanner...")
         threading.Thread(target=self._init_scanner, daemon=True).start()
 
     def __del__(self):
-        self.device.close()
+        self.session.close()
 
     def __getattr__(self, name):
-        return self.device.__getattribute__(name)
+        return self.session.device.__getattribute__(name)
+
+    def settings(self, source):
+        """
+        Device options for a scan from source, as configured
+        """
+        return {'source': source,
+                'mode': self.frame.config.Read('/Scan/Mode'),
+                'resolution': int(self.frame.config.Read('/Scan/Resolution'))}
 
     ###########################################################################
     # Status Management
@@ -39,9 +62,75 @@ class Scanner():
         self.PushStatusText(text)
 
     ###########################################################################
-    # Config Menu
+    # Importing
+    ###########################################################################
+
+    def import_pages(self, pages, results=None):
+        """
+        results are the pages' Engine Futures, if they're already being
+        processed
+        """
+        self.frame.importer.submit(Importer.SCAN,
+                                   f'{len(pages)} scanned page(s)',
+                                   partial(self.frame.library.import_images, results=results),
+                                   pages)
+
+    ###########################################################################
+    # Device Cache
     ###########################################################################
 
+    def LoadCache(self):
+        try:
+            devices = json.loads(self.frame.config.Read('/Scan/Cache/Devices', '[]'))
+            options = json.loads(self.frame.config.Read('/Scan/Cache/Options', '{}'))
+        except ValueError:
+            devices, options = [], {}
+        return devices, options
+
+    def SaveCache(self):
+        self.frame.config.Write('/Scan/Cache/Devices', json.dumps(self.devices))
+        self.frame.config.Write('/Scan/Cache/Options', json.dumps(self.options))
+
+    def OnDiscovered(self, devices, options):
+        """
+        Takes what _init_scanner found and only rebuilds the menus if it's
+        not what they already show
+        """
+        # Round trip so tuples compare equal to the lists JSON gives back
+        devices, options = json.loads(json.dumps([devices, options]))
+        if (devices, options) != (self.devices, self.options):
+            wx.LogDebug('Scanner: Devices have changed.  Rebuilding menus.')
+            self.devices, self.options = devices, options
+            self.SaveCache()
+            self.PopulateMenus()
+        else:
+            wx.LogDebug('Scanner: Devices are as cached')
+        if self.devices:
+            self.PushStatusText(self.frame.config.Read('/Scan/Device') + " Ready")
+        else:
+            wx.LogDebug('No scanner found')
+            self.PushStatusText('No scanner found')
+        self.frame.EnableScanUI(bool(self.devices))
+
+    ###########################################################################
+    # Config Menus
+    ###########################################################################
+
+    def PopulateMenus(self):
+        for menu in (self.deviceMenu, self.modeMenu):
+            menu.Clear()
+
+        if self.devices:
+            scanners = [{'shortHelp': device[2], 'longHelp': device[0], 'confValue': device[0]} for device in self.devices]
+            self.deviceMenu.AppendRadioSet(*scanners, confKey="Device")
+
+        if modes := self.options.get('mode'):
+            modeOptions = [{'shortHelp': mode, 'longHelp': mode, 'confValue': mode} for mode in modes]
+            self.modeMenu.AppendRadioSet(*modeOptions, confKey="Mode")
+            self.frame.config.DefaultTo('/Scan/Mode', modes[0])
+
+        self.frame.config.DefaultTo('/Scan/Resolution', '75')
+
     def ConfigMenu(self):
         menu = ConfMenu(self.frame, "/Scan")
         menu.AppendRadioSet(
@@ -81,15 +170,12 @@ class Scanner():
 
     def _init_scanner(self):
         wx.LogDebug('Initializing scanner')
-        self.sane_version = sane.init()
         while True:
             try:
-                devices = sane.get_devices()
+                devices = self.session.discover()
+                options = {}
                 if devices:
                     wx.LogDebug(repr(devices))
-                    scanners = [{'shortHelp': device[2], 'longHelp': device[0], 'confValue': device[0]} for device in devices]
-                    self.deviceMenu.AppendRadioSet(*scanners, confKey="Device")
-
                     if configured_devname := self.frame.config.Read('/Scan/Device', ''):
                         for device in devices:
                             if device[0] == configured_devname:
@@ -98,21 +184,12 @@ class Scanner():
                             self.frame.config.Write('/Scan/Device', device[0])
                     else:
                         self.frame.config.Write('/Scan/Device', devices[0][0])
-                    self.device = sane.open(self.frame.config.Read('/Scan/Device'))
-                    wx.CallAfter(self.PushStatusText, self.frame.config.Read('/Scan/Device') + " Ready")
-                    wx.LogDebug('Enabling Scan UI')
-                    for option in self.device.get_options():
-                        wx.LogDebug(f'Option: {option}')
-                        self.options[option[1]] = option[8]
-                    self.device.close()
-                    modeOptions = [{'shortHelp': mode, 'longHelp': mode, 'confValue': mode} for mode in self.options['mode']]
-                    self.modeMenu.AppendRadioSet(*modeOptions, confKey="Mode")
-                    self.frame.config.DefaultTo('/Scan/Mode', self.options['mode'][0])
-                    self.frame.config.DefaultTo('/Scan/Resolution', '75')
-                    self.frame.EnableScanUI()
-                else:
-                    wx.LogDebug('No scanner found')
-                    wx.CallAfter(self.PushStatusText, 'No scanner found')
+                    with self.session.use() as device:
+                        for option in device.get_options():
+                            wx.LogDebug(f'Option: {option}')
+                            if option[1] in self.CACHED_OPTIONS:
+                                options[option[1]] = option[8]
+                wx.CallAfter(self.OnDiscovered, devices, options)
                 break
             except sane._sane.error as e:
                 wx.LogDebug(repr(e))
@@ -121,6 +198,7 @@ class Scanner():
         self.PushStatusText("Scanning pages from ADF hardware duplexer.")
         self.frame.config.Write('/Scan/Source', 'ADF Duplex')
         self.pages = []
+        self.results = []
         thread = threading.Thread(target=self._scan_adf)
         thread.start()
         return thread
@@ -129,6 +207,7 @@ class Scanner():
         self.PushStatusText("Scanning fronts from ADF.")
         self.frame.config.Write('/Scan/Source', 'Manual Duplex')
         self.pages = []
+        self.results = []
         thread = threading.Thread(target=self._scan_adf)
         thread.start()
         return thread
@@ -137,21 +216,24 @@ class Scanner():
         self.PushStatusText("Scanning fronts from ADF.")
         self.frame.config.Write('/Scan/Source', 'ADF')
         self.pages = []
+        self.results = []
         thread = threading.Thread(target=self._scan_adf)
         thread.start()
         return thread
 
-    def receive_pages_from_adf(self, pages):
+    def receive_pages_from_adf(self, pages, results):
         if pages:
             if self.pages:
+                # Backs come out of the feeder last page first
                 self.pages = [j for i in zip(self.pages, reversed(pages)) for j in i]
-                self.PushStatusText("Processing scanned images")
-                self.frame.library.import_images(self.pages)
-                self.PopStatusText()
+                self.results = [j for i in zip(self.results, reversed(results)) for j in i]
+                self.import_pages(self.pages, self.results)
                 self.pages = []
+                self.results = []
                 self.PopStatusText()
             else:
                 self.pages.extend(pages)
+                self.results.extend(results)
                 if self.frame.config.Read('/Scan/Source', '') == 'Manual Duplex':
                     self.ReplaceStatusText("Waiting for stack flip.")
                     wx.MessageDialog(self.frame,
@@ -161,30 +243,48 @@ class Scanner():
                     self.ReplaceStatusText("Scanning backs from ADF.")
                     threading.Thread(target=self._scan_adf).start()
                 else:
-                    self.frame.library.import_images(self.pages)
+                    self.import_pages(self.pages, self.results)
                     self.pages = []
+                    self.results = []
                     self.PopStatusText()
         else:
             answer = wx.MessageBox("Please load the document into the ADF.", "", wx.OK|wx.CANCEL)
             if answer == wx.OK:
                 threading.Thread(target=self._scan_adf).start()
+            else:
+                self.discard_pages()
+                self.PopStatusText()
+
+    def discard_pages(self):
+        """
+        Give up on the pages scanned so far, and on their OCR
+        """
+        for future in self.results:
+            future.cancel()
+        self.pages = []
+        self.results = []
 
     def _scan_adf(self):
-        self.device = sane.open(self.frame.config.Read('/Scan/Device'))
         source = self.frame.config.Read('/Scan/Source', 'ADF')
         wx.LogDebug(f'Scan Source: {source}')
-        self.device.source = 'ADF' if source == 'Manual Duplex' else source
-        self.device.mode = self.frame.config.Read('/Scan/Mode')
-        self.device.resolution = int(self.frame.config.Read('/Scan/Resolution'))
-        self.device.br_x = self.device.opt['br_x'].constraint[1]  # X_max
-        self.device.br_y = self.device.opt['br_y'].constraint[1]  # Y_max
-        # wx.LogDebug(self.device.__dict__)
+        # Each page goes to the Engine as soon as it's off the feeder, so
+        # OCR keeps pace with the scanner instead of waiting for the stack
+        pages, results = [], []
         try:
-            pages = list(self.device.multi_scan())
-            self.device.close()
-            wx.CallAfter(self.receive_pages_from_adf, pages)
+            with self.session.use(full_area=True,
+                                  **self.settings('ADF' if source == 'Manual Duplex' else source)) as device:
+                for page in device.multi_scan():
+                    # Only the very first page of the Document needs a thumbnail
+                    thumbnail = not pages and not self.pages
+                    results.append(self.frame.library.engine.submit(page, thumbnail))
+                    pages.append(page)
+                    wx.LogDebug(f'Scanner._scan_adf(): Page {len(pages)} submitted')
+            wx.CallAfter(self.receive_pages_from_adf, pages, results)
         except sane._sane.error as e:
-            self.device.close()
+            for future in results:
+                future.cancel()
+            # Fronts from a manual duplex are no use without their backs
+            wx.CallAfter(self.discard_pages)
             wx.LogWarning(repr(e))
             self.PopStatusText()
 
@@ -195,24 +295,15 @@ class Scanner():
         return thread
 
     def _scan_one_from_flatbed(self):
-        self.device = sane.open(self.frame.config.Read('/Scan/Device'))
-        self.device.source = 'Flatbed'
-        self.device.mode = self.frame.config.Read('/Scan/Mode')
-        self.device.resolution = int(self.frame.config.Read('/Scan/Resolution'))
         while True:
             try:
-                wx.LogDebug(self.device.source)
-                wx.LogDebug(self.device.mode)
-                wx.LogDebug(str(self.device.resolution))
-                image = self.scan()
-                self.device.close()
+                with self.session.use(**self.settings('Flatbed')) as device:
+                    image = device.scan()
                 break
             except sane._sane.error as e:
-                self.device.close()
                 wx.LogVerbose(repr(e))
-        self.ReplaceStatusText("Processing scanned images")
-        self.frame.library.import_image(image)
-        self.PopStatusText()
+        self.import_pages([image])
+        wx.CallAfter(self.PopStatusText)
 
     def scan_multiple_from_flatbed(self, event=None):
         self.PushStatusText("Scanning Page 1 from flatbed.")
@@ -230,17 +321,14 @@ class Scanner():
             self.ReplaceStatusText(f"Scanning page {len(self.pages)+1} from flatbed")
             threading.Thread(target=self._scan_one_of_multiple).start()
         else:
-            self.ReplaceStatusText("Processing scanned images")
-            self.frame.library.import_images(self.pages)
+            self.import_pages(self.pages)
             self.PopStatusText()
             self.pages = []
 
     def _scan_one_of_multiple(self, event=None):
         wx.LogDebug('Scanner._scan_multiple_from_flatbed(): START')
-        self.device = sane.open(self.frame.config.Read('/Scan/Device'))
-        self.device.source = 'Flatbed'
-        self.device.mode = self.frame.config.Read('/Scan/Mode')
-        self.device.resolution = int(self.frame.config.Read('/Scan/Resolution'))
-        page = self.scan()
-        self.device.close()
+        # The Session stays open between pages, so there's no warm-up
+        # after the first one
+        with self.session.use(**self.settings('Flatbed')) as device:
+            page = device.scan()
         wx.CallAfter(self.receive_one_of_multiple, page)
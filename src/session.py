@@ -0,0 +1,138 @@
+import wx
+import sane
+import threading
+
+from contextlib import contextmanager
+
+
+class Session():
+    """
+    Keeps one SANE device open for as long as it's being used
+
+    Option values are remembered and only sent to the device when they
+    change.  The device is closed after idle seconds without a scan, and
+    after any error, so the next use starts from a fresh connection.
+    Nothing is opened until discover() has initialised SANE.
+    """
+
+    def __init__(self, frame, idle=120):
+        self.frame = frame
+        self.idle = idle
+        self.device = None
+        self.devname = None
+        self._options = {}
+        self._lock = threading.RLock()
+        self._timer = None
+        self._initialised = threading.Event()
+
+    ###########################################################################
+    # Public Methods
+    ###########################################################################
+
+    @contextmanager
+    def use(self, full_area=False, **options):
+        """
+        The open device, with options (source, mode, resolution...) applied
+
+        full_area sets the scan area to everything the source can reach.
+        Any SANE error closes the device on its way out.
+        """
+        self._initialised.wait()
+        with self._lock:
+            self._cancel_timer()
+            try:
+                device = self._open()
+                try:
+                    self._apply(options, full_area)
+                except sane._sane.error as e:
+                    # A connection that's gone stale usually fails here.
+                    # Give it one more try from scratch.
+                    wx.LogDebug(f'Session: Reconnecting after {e!r}')
+                    self.close()
+                    device = self._open()
+                    self._apply(options, full_area)
+                yield device
+            except sane._sane.error:
+                self.close()
+                raise
+            finally:
+                self._start_timer()
+
+    def discover(self):
+        """
+        Every SANE device, initialising SANE the first time
+
+        libsane isn't thread-safe, so scans wait for this to finish.
+        """
+        with self._lock:
+            if not self._initialised.is_set():
+                self.version = sane.init()
+                self._initialised.set()
+            return sane.get_devices()
+
+    def close(self):
+        with self._lock:
+            self._cancel_timer()
+            if self.device is not None:
+                wx.LogDebug(f'Session: Closing {self.devname}')
+                try:
+                    self.device.close()
+                except sane._sane.error as e:
+                    wx.LogDebug(repr(e))
+            self.device = None
+            self._options = {}
+
+    ###########################################################################
+    # Device Management
+    ###########################################################################
+
+    def _open(self):
+        devname = self.frame.config.Read('/Scan/Device')
+        if self.device is not None and devname != self.devname:
+            self.close()
+        if self.device is None:
+            wx.LogDebug(f'Session: Opening {devname}')
+            self.device = sane.open(devname)
+            self.devname = devname
+        return self.device
+
+    def _apply(self, options, full_area):
+        if 'source' in options and options['source'] != self._options.get('source'):
+            # The scan area depends on the source
+            self._options.pop('br_x', None)
+            self._options.pop('br_y', None)
+        for name, value in options.items():
+            self._set(name, value)
+        if full_area:
+            self._set('br_x', self.device.opt['br_x'].constraint[1])  # X_max
+            self._set('br_y', self.device.opt['br_y'].constraint[1])  # Y_max
+
+    def _set(self, name, value):
+        if self._options.get(name) != value:
+            wx.LogDebug(f'Session: {name} = {value}')
+            setattr(self.device, name, value)
+            self._options[name] = value
+
+    ###########################################################################
+    # Idle Timeout
+    ###########################################################################
+
+    def _start_timer(self):
+        if self.device is not None and self.idle:
+            self._timer = threading.Timer(self.idle, self._on_idle)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _on_idle(self):
+        # Leave it alone if a scan has just started
+        if self._lock.acquire(blocking=False):
+            try:
+                wx.LogDebug('Session: Idle')
+                self.close()
+            finally:
+                self._lock.release()
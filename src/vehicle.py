@@ -1,6 +1,9 @@
 import wx
 import os
 import json
+import threading
+
+from PIL import Image as PILImage
 
 class Vehicle():
     """
@@ -27,6 +30,29 @@ class Vehicle():
     def image_path(self):
         return os.path.join(self.path, 'image.png')
 
+    @property
+    def thumb_path(self):
+        return os.path.join(self.path, 'thumbnail.png')
+
+    def thumbnail(self, size=(400, 225)):
+        """
+        image.png scaled to size, from a cache that's only regenerated when
+        image.png is newer than it
+        """
+        try:
+            fresh = os.path.getmtime(self.thumb_path) >= os.path.getmtime(self.image_path)
+        except OSError:
+            fresh = False
+        if fresh:
+            with PILImage.open(self.thumb_path) as thumb:
+                if thumb.size == size:
+                    return thumb.convert('RGB')
+        wx.LogDebug(f'Vehicle.thumbnail(): Regenerating {self.thumb_path}')
+        with PILImage.open(self.image_path) as image:
+            thumb = image.convert('RGB').resize(size, PILImage.LANCZOS)
+        thumb.save(self.thumb_path)
+        return thumb
+
 
 class Plate():
     def __init__(self, vehicle, state, number):
@@ -50,13 +76,22 @@ class VehiclePage(wx.Panel):
 
         sizer = wx.BoxSizer(wx.VERTICAL)
 
-        sizer.Add(VehicleList(self, self.library.vehicles), 1, wx.EXPAND)
+        sizer.Add(VehicleList(self, self.library), 1, wx.EXPAND)
 
         self.SetSizer(sizer)
 
 class VehicleList(wx.ListCtrl):
-    def __init__(self, parent, vehicles):
+    """
+    Every Vehicle in the Library
+
+    The vehicles are read, and then their images loaded, on a background
+    thread.  Rows go in as soon as the vehicles are known, with a
+    placeholder until each image arrives.
+    """
+
+    def __init__(self, parent, library):
         super(VehicleList, self).__init__(parent, style=wx.LC_REPORT)
+        self.library = library
 
         # Image list to hold vehicle images
         self.image_list = wx.ImageList(400, 225)
@@ -70,14 +105,40 @@ class VehicleList(wx.ListCtrl):
         self.InsertColumn(4, 'Color')
         self.InsertColumn(5, 'VIN')
 
-        # Add the vehicles to the list
+        placeholder = wx.Image(400, 225)
+        placeholder.Clear(0xf0)  # Light grey
+        self.image_list.Add(wx.Bitmap(placeholder))
+        threading.Thread(target=self._load, name='VehicleList', daemon=True).start()
+
+    def _load(self):
+        try:
+            vehicles = self.library.vehicles
+        except OSError as e:
+            wx.LogDebug(f'VehicleList: {e!r}')
+            return
+        wx.CallAfter(self._on_vehicles, vehicles)
+        for index, vehicle in enumerate(vehicles):
+            try:
+                thumb = vehicle.thumbnail()
+            except Exception as e:
+                wx.LogDebug(f'VehicleList: {vehicle.image_path}: {e!r}')
+                continue
+            wx.CallAfter(self._on_image, index, thumb.width, thumb.height, thumb.tobytes())
+
+    def _on_vehicles(self, vehicles):
+        # The page may have gone away while the vehicles were being read
+        if not self:
+            return
         for vehicle in vehicles:
-            img = wx.Image(vehicle.image_path, wx.BITMAP_TYPE_ANY).Scale(400, 225)
-            img_idx = self.image_list.Add(wx.Bitmap(img))
-
-            index = self.InsertItem(self.GetItemCount(), "", img_idx)
+            index = self.InsertItem(self.GetItemCount(), "", 0)
             self.SetItem(index, 1, str(vehicle.year))  # Convert year to string
             self.SetItem(index, 2, vehicle.make)
             self.SetItem(index, 3, vehicle.model)
             self.SetItem(index, 4, vehicle.color)
             self.SetItem(index, 5, vehicle.vin)
+
+    def _on_image(self, index, width, height, pixels):
+        if not self:
+            return
+        img_idx = self.image_list.Add(wx.Bitmap.FromBuffer(width, height, pixels))
+        self.SetItemImage(index, img_idx)
@@ -1,10 +1,9 @@
 import wx
-import re
-import string
 # import dateutil.parser
 from thefuzz import fuzz
 
-from .placeable import Placeable
+from .date import is_date_token, year_span
+from .layout import Node, WORD
 
 RED = "\033[91m"
 GREEN = "\033[92m"
@@ -13,22 +12,53 @@ BLUE = "\033[94m"
 BOLD = "\033[1m"
 END = "\033[0m"
 
-class Word(Placeable):
-    def __init__(self, line, left, top, width, height, confidence, text):
-        super().__init__(left, top, width, height)
-        self.line = line
-        self.confidence = confidence
-        self.raw = text
-        self.type = None
-        self.date = None
+class Word(Node):
+    __slots__ = ()
+    LEVEL = WORD
 
     ###########################################################################
     # Properties
     ###########################################################################
 
+    @property
+    def raw(self):
+        return self.layout.raw(self.index)
+
     @property
     def text(self):
-        return self.raw.strip(string.punctuation)
+        return self.layout.get(self.index, 'text') or self.layout.text(self.index)
+
+    @text.setter
+    def text(self, value):
+        self.layout.set(self.index, 'text', value)
+
+    @property
+    def type(self):
+        return self.layout.get(self.index, 'type')
+
+    @type.setter
+    def type(self, value):
+        self.layout.set(self.index, 'type', value)
+
+    @property
+    def date(self):
+        return self.layout.get(self.index, 'date')
+
+    @date.setter
+    def date(self, value):
+        self.layout.set(self.index, 'date', value)
+
+    @property
+    def contig(self):
+        return self.layout.get(self.index, 'contig')
+
+    @contig.setter
+    def contig(self, value):
+        self.layout.set(self.index, 'contig', value)
+
+    @property
+    def line(self):
+        return self.parent
 
     @property
     def paragraph(self):
@@ -42,52 +72,13 @@ class Word(Placeable):
     def page(self):
         return self.block.page
 
-    @property
-    def prev(self):
-        index = self.line.words.index(self)
-        if index:
-            return self.line.words[index-1]
-
-    @property
-    def next(self):
-        index = self.line.words.index(self)
-        if index+1 < len(self.line.words):
-            return self.line.words[index+1]
-
     @property
     def is_date(self):
         if self.type == 'date':
             return True
         elif self.type:
             return False
-
-        # The DMV is a fan of 00/00/YYYY when they don't know the details
-        if re.findall(r'/00/', self.text):
-            wx.LogDebug(f"{RED}Found a fake DMV date that isn't a date: {self.text}{END}")
-            return False
-
-        # m[m]/d[d]/yy[yy]
-        wx.LogDebug(f'{BLUE}Checking if{END} {BOLD}{self.text}{END} {BLUE}is a m[m]/d[d]/yy[yy] date{END}')
-        match = re.search(r'^(\d{1,2})[/-](\d{1,2})[/-](\d{2}|\d{4})$', self.text)
-        if match:
-            wx.LogDebug(f'{BOLD}{self.text}{END} {YELLOW}looks a lot like m[m]/d[d]/yy[yy].  Checking ranges to be sure{END}')
-            if 0 < int(match.group(1)) < 13 and 0 < int(match.group(2)) < 32:
-                wx.LogDebug(f'{GREEN}Found a m[m]/d[d]/yy[yy] date:{END} {BOLD}{self.text}{END}')
-                return True
-            else:
-                wx.LogDebug(f"{RED}Looks like a date, but isn't a date. Possibly bad OCR:{END} {BOLD}{self.text}{END}")
-                return False
-
-
-        # d[d]-month-yy[yy]
-        months = '(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*'
-        match = re.search(r'(\d{1,2})-([a-zA-Z]+)-(\d{2,4})', self.text)
-        if match:
-            # wx.LogDebug(f"{self.text} is a match")
-            if 0 < int(match.group(1)) < 32:
-                if re.search(months, match.group(2), re.IGNORECASE):
-                    wx.LogDebug(f"Found a d[d]-month-yy[yy] date: {self.text}")
-                    return True
+        return is_date_token(self.text)
 
     @property
     def is_year(self):
@@ -95,32 +86,16 @@ class Word(Placeable):
             return True
         elif self.type:
             return False
-
-        months = '(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*'
-
-        wx.LogDebug(f'{BLUE}Checking if{END} {BOLD}{self.text}{END} {BLUE}is a 2 or 4-digit numbers that might be a year{END}')
-        if match := re.match(r'(\d{2,4}$)', self.text):
-            wx.LogDebug(f'{YELLOW}Could be a year: {match.group(1)}{END}')
-            if pw := self.prev:
-                wx.LogDebug(f'{BLUE}Evaluating if pw looks like a day-of-month ({END}{BOLD}{pw.text}{END}{BLUE}){END}')
-                match = re.match(r'(\d{1,2})', pw.text)
-                if match and 0 < int(match.group(1)) < 32:
-                    wx.LogDebug(f'{YELLOW}Could be a day of month: {match.group(1)}{END}')
-                    if ppw := pw.prev:
-                        wx.LogDebug(f'{BLUE}Evaluating ppw monthness ({END}{BOLD}{ppw.text}{END}{BLUE}){END}')
-                        if match := re.search(months, ppw.text, re.IGNORECASE):
-                            self.type = 'year'
-                            ppw.type = 'month'
-                            pw.type = 'day'
-                            wx.LogDebug(f'{GREEN}Found a three-token date: {ppw.text} {pw.text} {self.text}{END}')
-                            return True
-                wx.LogDebug(f'{BLUE}Checking if pw is day-month in a single token{END}')
-                if day_month := re.search(fr'(\d{{1,2}})-{months}', pw.text, re.IGNORECASE):
-                    self.type = 'year'
-                    pw.type = 'day-month'
-                    wx.LogDebug(f'{GREEN}Found a two-token date:{END} {BOLD}{pw.text} {self.text}{END}')
-                    return True
-        return False
+        pw = self.prev
+        ppw = pw.prev if pw else None
+        span = year_span(self.text,
+                         pw.text if pw else None,
+                         ppw.text if ppw else None)
+        if span == 3:
+            self.type, pw.type, ppw.type = 'year', 'day', 'month'
+        elif span == 2:
+            self.type, pw.type = 'year', 'day-month'
+        return bool(span)
 
     ###########################################################################
     # Public Methods
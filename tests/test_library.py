@@ -0,0 +1,52 @@
+import os
+import json
+import pytest
+
+for module in ('wx', 'sane', 'filetype', 'pytesseract', 'pdf2image', 'pypdf'):
+    pytest.importorskip(module)
+
+import wx
+
+from src.library import Library
+
+
+def make_document(dir, id, md5, **json_):
+    folder = os.path.join(dir, '2024', '01', '02', id)
+    os.makedirs(folder)
+    with open(os.path.join(folder, 'props.json'), 'w') as file:
+        json.dump({'md5': md5,
+                   'date': '2024-01-02',
+                   'imported': '2024-01-03',
+                   'original': 'original.tiff',
+                   'entities': [],
+                   **json_}, file)
+    for name in ('original.tiff', 'processed.pdf', 'thumbnail.webp'):
+        with open(os.path.join(folder, name), 'wb'):
+            pass
+    return folder
+
+
+def test_rescan_merges_duplicates(tmp_path, monkeypatch):
+    class Dialog():
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def ShowModal(self):
+            return wx.ID_YES
+
+    monkeypatch.setattr(wx, 'MessageDialog', Dialog)
+    first = make_document(str(tmp_path), 'a' * 32, 'same')
+    second = make_document(str(tmp_path), 'b' * 32, 'same', title='Second')
+
+    library = Library(str(tmp_path), workers=1)
+    try:
+        assert len(library.documents) == 1
+        kept, removed = (first, second) if library.documents[0].id == 'a' * 32 else (second, first)
+        assert os.path.exists(os.path.join(kept, 'props.json'))
+        assert not os.path.exists(removed)
+        assert [row['id'] for row in library.index.rows()] == [library.documents[0].id]
+        with open(os.path.join(kept, 'props.json')) as file:
+            assert json.load(file)['title'] == 'Second'
+    finally:
+        library.engine.shutdown()
+        library.atlas.close()